@@ -1,62 +1,317 @@
+import argparse
 import math
+import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-def add_spherical_uv_to_egg(file_path, output_path):
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
+MODEL_SUFFIXES = ('.egg', '.obj')
+OUTPUT_SUFFIX  = '_uv'
+# Vertices this close to u = 0 get a u + 1 twin for seam-crossing polygons.
+SEAM_BAND      = 0.25
+IO_BUFFER      = 1 << 20
 
-    vertex_pattern = re.compile(r'<Vertex> (\d+) {')
-    vertex_pos_pattern = re.compile(r'(\-?\d+\.?\d*) (\-?\d+\.?\d*) (\-?\d+\.?\d*)')
+# Only a vertex's own position line: three or four numbers and nothing else.
+_position = re.compile(r'^(\s*)([-+]?[\d.]+(?:[eE][-+]?\d+)?)\s+([-+]?[\d.]+(?:[eE][-+]?\d+)?)\s+'
+                       r'([-+]?[\d.]+(?:[eE][-+]?\d+)?)(?:\s+[-+]?[\d.]+(?:[eE][-+]?\d+)?)?\s*$')
+_vertex_ref = re.compile(r'<VertexRef>\s*{([^<]*)<Ref>\s*{\s*([^}]*?)\s*}\s*}')
 
-    # Parse all vertices
-    vertices = []
-    for line in lines:
-        match = vertex_pos_pattern.search(line)
-        if match:
-            x, y, z = map(float, match.groups())
-            vertices.append((x, y, z))
+# Axes (a, b, up) such that u follows the angle in the a-b plane.
+AXES = {'x': (1, 2, 0), 'y': (2, 0, 1), 'z': (0, 1, 2)}
 
-    if not vertices:
-        raise ValueError("No vertices found in the .egg file.")
 
-    modified_lines = []
-    vertex_index = -1
-    uv_inserted = False
+def spherical_uv(x, y, z, up='z'):
+    """Equirectangular UV of a point on a sphere centred at the origin."""
+    p = (x, y, z)
+    a, b, c = (p[k] for k in AXES[up])
+    length = math.sqrt(a * a + b * b + c * c)
+    if length == 0:
+        return 0.5, 0.5
+    u = 0.5 + math.atan2(b, a) / (2 * math.pi)
+    v = 0.5 - math.asin(max(-1.0, min(1.0, c / length))) / math.pi
+    return u, v
 
-    for i, line in enumerate(lines):
-        modified_lines.append(line)
 
-        if '<Vertex>' in line:
-            match = vertex_pattern.search(line)
-            if match:
-                vertex_index = int(match.group(1))
-                uv_inserted = False
+def _crosses_seam(us):
+    return max(us) - min(us) > 0.5
 
-        if vertex_index != -1 and not uv_inserted:
-            match = vertex_pos_pattern.search(line)
-            if match:
-                x, y, z = map(float, match.groups())
 
-                # Normalize to unit sphere (optional, assuming sphere already centered)
-                length = math.sqrt(x**2 + y**2 + z**2)
-                if length == 0:
-                    u = v = 0.5  # Default value at center
-                else:
-                    nx, ny, nz = x / length, y / length, z / length
+class Stats:
+    def __init__(self, path):
+        self.path = path
+        self.bytes = os.path.getsize(path)
+        self.lines = 0
+        self.vertices = 0
+        self.seam_vertices = 0
+        self.seam_faces = 0
+        self.unfixed_faces = 0
+        self.seconds = 0.0
 
-                    u = 0.5 + (math.atan2(ny, nx) / (2 * math.pi))   # Longitude
-                    v = 0.5 - (math.asin(nz) / math.pi)              # Latitude
+    def __str__(self):
+        rate = self.bytes / 2**20 / max(self.seconds, 1e-9)
+        text = (f"{os.path.basename(self.path)}: {self.vertices} vertices, {self.seam_faces} seam faces "
+                f"({self.seam_vertices} duplicated vertices), {self.bytes / 2**20:.2f} MB in "
+                f"{self.seconds:.2f}s ({rate:.1f} MB/s, {self.lines / max(self.seconds, 1e-9):,.0f} lines/s)")
+        if self.unfixed_faces:
+            text += f", {self.unfixed_faces} seam faces left stretched (raise --seam-band)"
+        return text
 
-                uv_line = f'  <UV> {{ {u:.6f} {v:.6f} }}\n'
-                modified_lines.append(uv_line)
-                uv_inserted = True
-                vertex_index = -1
 
-    with open(output_path, 'w') as out_file:
-        out_file.writelines(modified_lines)
+def add_spherical_uv_to_egg(file_path, output_path, up='auto', seam_band=SEAM_BAND):
+    """
+    Streams an .egg file, giving every vertex a spherical <UV> in place of
+    any it had. Polygons spanning the u = 0/1 seam are pointed at twins of
+    their low-u vertices, added to the end of the pool with u + 1.
+    """
+    stats = Stats(file_path)
+    start = time.perf_counter()
+    pools = {}
+    depth = 0
+    pool = pool_depth = None
+    vertex = vertex_depth = None
+    vertex_lines = []
+    skip_depth = None
+    ref_lines = ref_depth = None
+
+    with open(file_path, 'r', buffering=IO_BUFFER) as src, open(output_path, 'w', buffering=IO_BUFFER) as out:
+        for line in src:
+            stats.lines += 1
+            stripped = line.lstrip()
+            opens, closes = line.count('{'), line.count('}')
+
+            if up == 'auto' and stripped.startswith('<CoordinateSystem>'):
+                up = 'y' if 'Y-Up' in line else 'z'
+
+            if skip_depth is not None:
+                depth += opens - closes
+                if depth <= skip_depth:
+                    skip_depth = None
+                continue
+
+            if ref_lines is not None:
+                ref_lines.append(line)
+                depth += opens - closes
+                if depth <= ref_depth:
+                    out.write(_rewrite_refs(''.join(ref_lines), pools, stats))
+                    ref_lines = None
+                continue
+
+            if vertex is not None:
+                if stripped.startswith('<UV>'):
+                    if opens > closes:
+                        skip_depth = depth
+                        depth += opens - closes
+                    continue
+                vertex_lines.append(line)
+                out.write(line)
+                match = _position.match(line) if vertex[1] is None else None
+                if match:
+                    indent, x, y, z = match.groups()
+                    u, v = spherical_uv(float(x), float(y), float(z), 'z' if up == 'auto' else up)
+                    vertex[1] = u
+                    uv_line = f'{indent}<UV> {{ {u:.6f} {v:.6f} }}\n'
+                    vertex_lines.append(uv_line)
+                    out.write(uv_line)
+                depth += opens - closes
+                if depth <= vertex_depth:
+                    u = vertex[1] if vertex[1] is not None else 0.5
+                    pools[pool][0][vertex[0]] = u
+                    if u < seam_band:
+                        pools[pool][2].append((vertex[0], vertex_lines))
+                    stats.vertices += 1
+                    vertex = None
+                continue
+
+            if stripped.startswith('<VertexPool>'):
+                tokens = stripped.split()
+                pool = tokens[1] if len(tokens) > 2 else ''
+                pools[pool] = ({}, {}, [])
+                pool_depth = depth
+            elif stripped.startswith('<Vertex>') and pool is not None:
+                vertex = [int(stripped.split()[1]), None]
+                vertex_depth = depth
+                vertex_lines = [line]
+                depth += opens - closes
+                out.write(line)
+                continue
+            elif stripped.startswith('<VertexRef>'):
+                ref_lines, ref_depth = [line], depth
+                depth += opens - closes
+                if depth <= ref_depth:
+                    out.write(_rewrite_refs(line, pools, stats))
+                    ref_lines = None
+                continue
+
+            depth += opens - closes
+            if pool is not None and depth <= pool_depth:
+                _write_seam_twins(out, pools[pool], stats)
+                pool = None
+            out.write(line)
+
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def _write_seam_twins(out, pool, stats):
+    """Appends a u + 1 copy of every low-u vertex of a pool that is about to close."""
+    us, twins, low = pool
+    next_id = max(us, default=0) + 1
+    for vid, lines in low:
+        twins[vid] = next_id
+        header = lines[0].replace(f'<Vertex> {vid} ', f'<Vertex> {next_id} ', 1)
+        body = []
+        for line in lines[1:]:
+            if line.lstrip().startswith('<UV>') and '{' in line:
+                indent = line[:len(line) - len(line.lstrip())]
+                u, v = line.split('{', 1)[1].split('}', 1)[0].split()
+                line = f'{indent}<UV> {{ {float(u) + 1:.6f} {v} }}\n'
+            body.append(line)
+        out.write(header)
+        out.writelines(body)
+        next_id += 1
+    stats.seam_vertices += len(low)
+
+
+def _rewrite_refs(text, pools, stats):
+    """Points a seam-crossing polygon's low-u vertices at their twins."""
+    match = _vertex_ref.search(text)
+    if not match or match.group(2) not in pools:
+        return text
+    us, twins, _ = pools[match.group(2)]
+    ids = [int(i) for i in match.group(1).split()]
+    if len(ids) < 2 or not _crosses_seam([us.get(i, 0.5) for i in ids]):
+        return text
+    stats.seam_faces += 1
+    fixed = []
+    for i in ids:
+        if us.get(i, 0.5) < 0.5:
+            if i not in twins:
+                stats.unfixed_faces += 1
+                return text
+            i = twins[i]
+        fixed.append(i)
+    indent = text[:len(text) - len(text.lstrip())]
+    tail = text[match.end():].strip()
+    return f"{indent}<VertexRef> {{ {' '.join(map(str, fixed))} <Ref> {{ {match.group(2)} }} }}{(' ' + tail) if tail else ''}\n"
+
+
+def add_spherical_uv_to_obj(file_path, output_path, up='auto'):
+    """
+    Streams a Wavefront .OBJ, writing a spherical vt after every v and
+    pointing every face at them in place of any texture coordinates it had.
+    Seam-crossing faces get extra vt lines with u + 1 written just before them.
+    """
+    stats = Stats(file_path)
+    start = time.perf_counter()
+    up = 'y' if up == 'auto' else up
+    us, vs, vt_of = [], [], []
+    n_vt = 0
+
+    with open(file_path, 'r', buffering=IO_BUFFER) as src, open(output_path, 'w', buffering=IO_BUFFER) as out:
+        for line in src:
+            stats.lines += 1
+            head = line[:2]
+            if head == 'v ':
+                out.write(line)
+                parts = line.split()
+                u, v = spherical_uv(float(parts[1]), float(parts[2]), float(parts[3]), up)
+                us.append(u)
+                vs.append(v)
+                n_vt += 1
+                vt_of.append(n_vt)
+                out.write(f'vt {u:.6f} {v:.6f}\n')
+                stats.vertices += 1
+            elif head == 'vt':
+                continue
+            elif head == 'f ':
+                corners = []
+                for token in line.split()[1:]:
+                    fields = token.split('/')
+                    vi = int(fields[0])
+                    vi = vi if vi > 0 else len(us) + 1 + vi
+                    normal = fields[2] if len(fields) > 2 and fields[2] else None
+                    corners.append((vi, normal))
+                face_us = [us[vi - 1] for vi, _ in corners]
+                texcoords = [vt_of[vi - 1] for vi, _ in corners]
+                if _crosses_seam(face_us):
+                    stats.seam_faces += 1
+                    for k, (vi, _) in enumerate(corners):
+                        if face_us[k] < 0.5:
+                            out.write(f'vt {face_us[k] + 1:.6f} {vs[vi - 1]:.6f}\n')
+                            n_vt += 1
+                            stats.seam_vertices += 1
+                            texcoords[k] = n_vt
+                out.write('f ' + ' '.join(
+                    f'{vi}/{t}/{n}' if n else f'{vi}/{t}' for (vi, n), t in zip(corners, texcoords)
+                ) + '\n')
+            else:
+                out.write(line)
+
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def add_spherical_uv(file_path, output_path, up='auto', seam_band=SEAM_BAND):
+    """Bakes spherical UVs into an .egg or .OBJ file, picked by its extension."""
+    if file_path.lower().endswith('.obj'):
+        return add_spherical_uv_to_obj(file_path, output_path, up)
+    return add_spherical_uv_to_egg(file_path, output_path, up, seam_band)
+
+
+def _output_path(source, output, batch):
+    stem, ext = os.path.splitext(os.path.basename(source))
+    if output and not batch:
+        return output
+    directory = output or os.path.dirname(source)
+    return os.path.join(directory, f"{stem}{OUTPUT_SUFFIX}{ext}")
+
+
+def collect_models(inputs):
+    """Model files named by inputs, walking directories and skipping earlier outputs."""
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in sorted(names)
+                             if n.lower().endswith(MODEL_SUFFIXES)
+                             and not os.path.splitext(n)[0].endswith(OUTPUT_SUFFIX))
+        else:
+            files.append(path)
+    return files
+
+
+def _run(job):
+    return add_spherical_uv(*job)
 
 
 if __name__ == "__main__":
-    input_file = 'assets/models/planet_sphere.egg'
-    output_file = 'assets/models/planet_sphere_with_uv.egg'
-    add_spherical_uv_to_egg(input_file, output_file)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Bake spherical UV coordinates into .egg and .OBJ models.")
+    parser.add_argument('inputs', nargs='+', help="model files or directories of them")
+    parser.add_argument('-o', '--output', help="output file for one input, otherwise an output directory "
+                                               f"(default: next to each input with a {OUTPUT_SUFFIX} suffix)")
+    parser.add_argument('--up', choices=('auto', 'x', 'y', 'z'), default='auto',
+                        help="polar axis; auto reads <CoordinateSystem> in .egg files (default Z) and uses Y for .OBJ")
+    parser.add_argument('--seam-band', type=float, default=SEAM_BAND,
+                        help=".egg vertices with u below this get a twin for polygons across the seam")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="files processed in parallel")
+    args = parser.parse_args()
+
+    files = collect_models(args.inputs)
+    batch = len(files) > 1 or any(os.path.isdir(p) for p in args.inputs)
+    if batch and args.output:
+        os.makedirs(args.output, exist_ok=True)
+    jobs = [(f, _output_path(f, args.output, batch), args.up, args.seam_band) for f in files]
+
+    start = time.perf_counter()
+    if len(jobs) > 1 and args.jobs > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(jobs))) as pool:
+            results = list(pool.map(_run, jobs))
+    else:
+        results = [_run(job) for job in jobs]
+    elapsed = time.perf_counter() - start
+
+    for (_, output, *_), stats in zip(jobs, results):
+        print(f"{stats} -> {output}")
+    total = sum(s.bytes for s in results) / 2**20
+    print(f"{len(results)} files, {sum(s.vertices for s in results)} vertices, {total:.2f} MB "
+          f"in {elapsed:.2f}s ({total / max(elapsed, 1e-9):.1f} MB/s)")
@@ -0,0 +1,15 @@
+#version 140
+
+uniform sampler2D p3d_Texture0;
+uniform vec4 tint;
+uniform float ambient;
+
+in vec2 texcoord;
+in float diffuse;
+
+out vec4 p3d_FragColor;
+
+void main() {
+    vec4 color = texture(p3d_Texture0, texcoord) * tint;
+    p3d_FragColor = vec4(color.rgb * (ambient + (1.0 - ambient) * diffuse), color.a);
+}
@@ -0,0 +1,38 @@
+#version 140
+
+// One instance per asteroid. Each texel of the instance buffer holds the
+// asteroid's position relative to the belt (xyz) and its radius (w).
+uniform samplerBuffer instances;
+uniform vec3 light_pos;
+uniform float osg_FrameTime;
+uniform mat4 p3d_ModelViewProjectionMatrix;
+
+in vec4 p3d_Vertex;
+in vec3 p3d_Normal;
+in vec2 p3d_MultiTexCoord0;
+
+out vec2 texcoord;
+out float diffuse;
+
+float hash(float n) {
+    return fract(sin(n) * 43758.5453);
+}
+
+void main() {
+    vec4 inst = texelFetch(instances, gl_InstanceID);
+    float id = float(gl_InstanceID);
+
+    // Squash and tumble the shared sphere per instance so rocks look irregular.
+    vec3 stretch = 0.6 + 0.8 * vec3(hash(id), hash(id + 1.7), hash(id + 3.1));
+    float spin = osg_FrameTime * (hash(id + 5.3) - 0.5) * 2.0 + hash(id + 7.9) * 6.2832;
+    float c = cos(spin), s = sin(spin);
+    mat3 rot = mat3(c, s, 0.0, -s, c, 0.0, 0.0, 0.0, 1.0);
+
+    vec3 local = rot * (p3d_Vertex.xyz * stretch);
+    vec3 pos = inst.xyz + local * inst.w;
+    vec3 normal = normalize(rot * (p3d_Normal / stretch));
+
+    diffuse = max(dot(normal, normalize(light_pos - pos)), 0.0);
+    texcoord = p3d_MultiTexCoord0;
+    gl_Position = p3d_ModelViewProjectionMatrix * vec4(pos, 1.0);
+}
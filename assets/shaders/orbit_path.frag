@@ -0,0 +1,9 @@
+#version 140
+
+in vec4 color;
+
+out vec4 p3d_FragColor;
+
+void main() {
+    p3d_FragColor = color;
+}
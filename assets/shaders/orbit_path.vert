@@ -0,0 +1,42 @@
+#version 140
+
+// One instance per orbit, drawn with a shared line strip whose vertex x runs
+// from 0 at the body to 1 at the far end of its trail. Three texels per
+// orbit in the buffer:
+//   0: semi-major axis, semi-minor axis, eccentricity, inclination (radians)
+//   1: body position in render space (xyz), its eccentric anomaly now (w)
+//   2: colour (rgb), eccentric anomaly of the trail's end minus the body's (w)
+uniform samplerBuffer orbits;
+uniform float trail_span;
+uniform float trail_floor;
+uniform mat4 p3d_ModelViewProjectionMatrix;
+
+in vec4 p3d_Vertex;
+
+out vec4 color;
+
+void main() {
+    int base = gl_InstanceID * 3;
+    vec4 shape = texelFetch(orbits, base);
+    vec4 now = texelFetch(orbits, base + 1);
+    vec4 style = texelFetch(orbits, base + 2);
+    float a = shape.x, b = shape.y, e = shape.z;
+    float En = now.w;
+
+    // Vertices are spaced evenly in eccentric anomaly, which keeps eccentric
+    // orbits smooth. Offsets from the body are taken in difference form,
+    //   cos(En + d) - cos(En) = -2 sin(En + d/2) sin(d/2),
+    // so the path stays exact near the body however large the orbit.
+    float d = style.w * p3d_Vertex.x;
+    float h = 0.5 * d;
+    float chord = 2.0 * sin(h);
+    float dx = -a * sin(En + h) * chord;
+    float dy = b * cos(En + h) * chord;
+    vec3 pos = now.xyz + vec3(dx, dy * cos(shape.w), dy * sin(shape.w));
+
+    // Kepler's equation gives how long ago the body was here.
+    float dM = d - e * cos(En + h) * chord;
+    float fade = 1.0 - clamp(abs(dM) / trail_span, 0.0, 1.0);
+    color = vec4(style.rgb, mix(trail_floor, 1.0, fade * fade));
+    gl_Position = p3d_ModelViewProjectionMatrix * vec4(pos, 1.0);
+}
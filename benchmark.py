@@ -0,0 +1,295 @@
+import argparse
+import copy
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SIM_DIR  = os.path.join(ROOT_DIR, 'sim')
+sys.path.insert(0, SIM_DIR)
+
+from panda3d.core import PandaSystem, loadPrcFileData
+
+DEFAULT_SIZES = (10, 1_000, 10_000, 100_000)
+TEXTURES = (
+    'assets/textures/mercury.jpeg', 'assets/textures/venus.jpeg', 'assets/textures/earth.jpg',
+    'assets/textures/mars.png', 'assets/textures/jupyter.jpg', 'assets/textures/saturn.jpeg',
+    'assets/textures/uranus.jpeg', 'assets/textures/neptune.jpeg', 'assets/textures/moon.jpg',
+)
+
+
+def make_scene(n_bodies, seed=0):
+    """
+    A synthetic scene.json with exactly n_bodies bodies: a sun, about
+    sqrt(n) planets and the rest spread over them as moons. Every tenth
+    planet gets rings and every seventh a cloud overlay.
+    """
+    rng = np.random.default_rng(seed)
+    n_planets = max(1, min(n_bodies - 1, int(round(np.sqrt(n_bodies)))))
+    moons = np.bincount(rng.integers(0, n_planets, max(0, n_bodies - 1 - n_planets)), minlength=n_planets)
+
+    planets = []
+    for i in range(n_planets):
+        orbit_radius = 10.0 + 6.0 * i
+        planet = {
+            "name": f"Planet {i}",
+            "type": "planet",
+            "radius": float(rng.uniform(0.3, 1.2)),
+            "orbit_radius": orbit_radius,
+            "eccentricity": float(rng.uniform(0, 0.1)),
+            "orbit_speed": float(60 * orbit_radius ** -0.5),
+            "rotation_speed": float(rng.uniform(5, 40)),
+            "inclination": float(rng.normal(0, 3)),
+            "texture": TEXTURES[i % len(TEXTURES)],
+            "children": [
+                {
+                    "name": f"Moon {i}.{j}",
+                    "type": "moon",
+                    "radius": float(rng.uniform(0.03, 0.15)),
+                    "orbit_radius": float(rng.uniform(1.5, 2.8)),
+                    "orbit_speed": float(rng.uniform(20, 60)),
+                    "rotation_speed": float(rng.uniform(10, 60)),
+                    "inclination": float(rng.normal(0, 5)),
+                    "texture": "assets/textures/moon.jpg",
+                }
+                for j in range(moons[i])
+            ],
+        }
+        if i % 10 == 9:
+            planet["rings"] = {"inner_radius": 1.3, "outer_radius": 2.2, "texture": "assets/textures/saturn_ring2.png"}
+        if i % 7 == 6:
+            planet["overlay"] = {"texture": "assets/textures/earth_clouds.png", "speed": 20.0}
+        planets.append(planet)
+
+    return {
+        "name": "Sun",
+        "type": "star",
+        "radius": 2.0,
+        "rotation_speed": 5.0,
+        "texture": "assets/textures/sun.png",
+        "children": planets,
+    }
+
+
+def _rss_bytes():
+    """Current resident set size of this process."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _percentiles(samples):
+    samples = np.asarray(samples) * 1000
+    return {
+        "mean": float(samples.mean()),
+        "p50": float(np.percentile(samples, 50)),
+        "p95": float(np.percentile(samples, 95)),
+        "p99": float(np.percentile(samples, 99)),
+    }
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _load_sim_app():
+    """sim/__main__.py as a module, without running its entry point."""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location('sim_app', os.path.join(SIM_DIR, '__main__.py'))
+    sim_app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sim_app)
+    return sim_app
+
+
+def make_app(window_type):
+    """
+    The app as shipped (SolarSystemApp, with its depth slices, floating
+    origin and skydome), minus the input handling, which needs a real
+    window, on the default scene.
+    """
+    loadPrcFileData('', f'window-type {window_type}')
+    loadPrcFileData('', 'audio-library-name null')
+    loadPrcFileData('', 'sync-video 0')
+    loadPrcFileData('', f'model-path {SIM_DIR}')
+    loadPrcFileData('', f'model-path {ROOT_DIR}')
+
+    sim_app = _load_sim_app()
+    return sim_app.SolarSystemApp(os.path.join(SIM_DIR, 'scene.json'), interactive=False)
+
+
+def _wait_for_textures(app, timeout=120.0):
+    deadline = time.perf_counter() + timeout
+    while app.asset_loader.busy and time.perf_counter() < deadline:
+        app.taskMgr.step()
+        time.sleep(0.001)
+
+
+def bench_size(app, n_bodies, frames, warmup, seed):
+    """Runs every measurement on one synthetic scene and returns its result row."""
+    from core.scene_file import load_scene, write_scene_file
+    from core.simulation import Simulation
+    from objects.celestial_body import _make_sphere_geom
+
+    scene = make_scene(n_bodies, seed)
+    manager = app.scene_manager
+
+    manager.build_scene({"name": "Sun", "texture": "assets/textures/sun.png"})
+    _wait_for_textures(app)
+    rss_before = _rss_bytes()
+
+    build_s = _timed(manager.build_scene, scene)
+    textures_s = _timed(_wait_for_textures, app)
+    rss_after = _rss_bytes()
+
+    if app.camera is not None:
+        app.camera.setPos(0, -3 * scene["children"][-1]["orbit_radius"], 40)
+        app.camera.lookAt(0, 0, 0)
+    for _ in range(warmup):
+        app.taskMgr.step()
+    frame_times = [_timed(app.taskMgr.step) for _ in range(frames)]
+
+    edited = copy.deepcopy(scene)
+    edited["children"][0]["radius"] *= 1.1
+    added = copy.deepcopy(edited)
+    added["children"][0]["children"].append({
+        "name": "Benchmark Moon", "type": "moon", "radius": 0.1, "orbit_radius": 2.0,
+        "orbit_speed": 20.0, "texture": "assets/textures/moon.jpg",
+    })
+    reload_ms = {
+        "edit": _timed(manager.update_scene, edited) * 1000,
+        "add": _timed(manager.update_scene, added) * 1000,
+        "remove": _timed(manager.update_scene, edited) * 1000,
+    }
+
+    # A Kepler step only advances time; the per-frame work is solving every position.
+    sim = Simulation.from_scene(scene)
+    positions_s = []
+    for _ in range(20):
+        sim.step()
+        positions_s.append(_timed(sim.engine.world_positions))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, binary_path = os.path.join(tmp, 'scene.json'), os.path.join(tmp, 'scene.scnb')
+        with open(json_path, 'w') as f:
+            json.dump(scene, f)
+        write_scene_file(scene, binary_path)
+        scene_load_ms = {
+            "json": _timed(load_scene, json_path) * 1000,
+            "binary": _timed(load_scene, binary_path) * 1000,
+        }
+
+    sphere_s = min(_timed(_make_sphere_geom, 1.0, 64, 128) for _ in range(3))
+
+    return {
+        "bodies": n_bodies,
+        "build_s": build_s,
+        "body_construction_us": build_s / n_bodies * 1e6,
+        "texture_load_s": textures_s,
+        "frame_ms": _percentiles(frame_times),
+        "reload_ms": reload_ms,
+        "positions_ms": float(np.median(positions_s) * 1000),
+        "scene_load_ms": scene_load_ms,
+        "rss_delta_mb": (rss_after - rss_before) / 2**20,
+        "texture_mb": app.texture_manager.resident_bytes / 2**20,
+        "sphere_geom_64x128_ms": sphere_s * 1000,
+    }
+
+
+def compare(old_path, new):
+    """Prints the relative change of every numeric metric against an earlier results file."""
+    with open(old_path) as f:
+        old = {row["bodies"]: row for row in json.load(f)["results"]}
+
+    def flatten(row, prefix=""):
+        for key, value in row.items():
+            if isinstance(value, dict):
+                yield from flatten(value, f"{prefix}{key}.")
+            elif isinstance(value, (int, float)) and key != "bodies":
+                yield f"{prefix}{key}", value
+
+    for row in new["results"]:
+        base = old.get(row["bodies"])
+        if base is None:
+            continue
+        print(f"\n{row['bodies']} bodies vs {old_path}")
+        before = dict(flatten(base))
+        for key, value in flatten(row):
+            if before.get(key):
+                print(f"  {key:<28} {before[key]:>12.3f} -> {value:>12.3f} ({(value / before[key] - 1) * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scene build, reload, stepping and rendering on synthetic scenes.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="body counts to benchmark")
+    parser.add_argument('--frames', type=int, default=120, help="frames measured per size")
+    parser.add_argument('--warmup', type=int, default=30, help="frames run before measuring")
+    parser.add_argument('--window-type', default='offscreen', choices=('offscreen', 'none'),
+                        help="offscreen renders into a buffer; none skips rendering entirely")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--write-scenes', metavar='DIR', help="also save the generated scene.json files here")
+    parser.add_argument('--output', help="results file (default: benchmarks/results-<time>.json)")
+    parser.add_argument('--compare', metavar='RESULTS', help="print changes against an earlier results file")
+    args = parser.parse_args()
+
+    if args.write_scenes:
+        os.makedirs(args.write_scenes, exist_ok=True)
+        for n in args.sizes:
+            with open(os.path.join(args.write_scenes, f"scene_{n}.json"), 'w') as f:
+                json.dump(make_scene(n, args.seed), f, indent=2)
+
+    os.chdir(ROOT_DIR)
+    app = make_app(args.window_type)
+    results = []
+    for n in args.sizes:
+        print(f"Benchmarking {n} bodies...")
+        row = bench_size(app, n, args.frames, args.warmup, args.seed)
+        print(f"  build {row['build_s']:.2f}s, frame p50 {row['frame_ms']['p50']:.2f}ms "
+              f"p95 {row['frame_ms']['p95']:.2f}ms, edit reload {row['reload_ms']['edit']:.1f}ms, "
+              f"positions {row['positions_ms']:.2f}ms, +{row['rss_delta_mb']:.0f} MB")
+        results.append(row)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "panda3d": PandaSystem.getVersionString(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "window_type": args.window_type,
+            "renderer": app.win.getGsg().getDriverRenderer() if app.win else None,
+            "frames": args.frames,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(ROOT_DIR, 'benchmarks', time.strftime("results-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
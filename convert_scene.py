@@ -0,0 +1,40 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'sim'))
+
+from core.scene_file import BINARY_SUFFIX, SceneFile, write_scene_file
+
+
+def convert(source, output):
+    """Converts scene.json to the binary format, or a binary scene back to JSON, by output's suffix."""
+    start = time.perf_counter()
+    if output.endswith(BINARY_SUFFIX):
+        with open(source, 'r') as f:
+            count = write_scene_file(json.load(f), output)
+    else:
+        scene = SceneFile(source)
+        count = scene.count
+        tmp_path = output + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(scene.subtree(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, output)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {count} bodies to {output} ({os.path.getsize(output) / 2**20:.1f} MB) in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=f"Convert a scene.json to the memory-mapped {BINARY_SUFFIX} format, or back.")
+    parser.add_argument('source')
+    parser.add_argument('output', nargs='?',
+                        help=f"default: source with its suffix swapped between .json and {BINARY_SUFFIX}")
+    args = parser.parse_args()
+
+    stem, suffix = os.path.splitext(args.source)
+    output = args.output or stem + ('.json' if suffix == BINARY_SUFFIX else BINARY_SUFFIX)
+    convert(args.source, output)
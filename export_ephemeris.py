@@ -0,0 +1,242 @@
+import argparse
+import os
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'sim'))
+
+from core.scene_file import load_scene
+from core.simulation import Simulation
+from utils.orbit_math import inclined_positions, solve_kepler
+
+FORMATS    = ('csv', 'npz', 'parquet')
+CHUNK_ROWS = 1 << 20
+# Orbital elements a worker needs to propagate its bodies and their ancestors.
+ELEMENTS   = ("orbit_radius", "semi_minor", "eccentricity", "inclination", "orbit_speed", "orbit_phase")
+
+
+def sample_times(start, rate, k0, k1):
+    """Times of samples k0..k1-1; computed from k so every chunk lands on the same grid."""
+    return start + np.arange(k0, k1) / rate
+
+
+def _group_task(engine, paths, b0, b1):
+    """
+    Everything a worker needs for bodies b0..b1-1: their elements and those
+    of their ancestors, which precede them in pre-order, with parents
+    renumbered into that subset.
+    """
+    parent = engine.parent[:engine.count]
+    rows, hop = [np.arange(b0, b1)], parent[b0:b1]
+    while (hop >= 0).any():
+        hop = np.unique(hop[hop >= 0])
+        rows.append(hop)
+        hop = parent[hop]
+    rows = np.unique(np.concatenate(rows))
+    task = {name: getattr(engine, name)[rows] for name in ELEMENTS}
+    sub_parent = parent[rows]
+    task["parent"] = np.where(sub_parent >= 0, np.searchsorted(rows, sub_parent), -1)
+    task["depth"] = engine.depth[rows]
+    task["output"] = np.searchsorted(rows, np.arange(b0, b1))
+    task["fields"] = [_csv_field(path) for path in paths[b0:b1]]
+    return task
+
+
+def _csv_field(text):
+    if any(c in text for c in ',"\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def propagate(task, times):
+    """World positions of the task's bodies at every time, as a (len(times), bodies, 3) array."""
+    shape = (len(times), len(task["parent"]))
+    anomaly = np.radians(task["orbit_phase"] + task["orbit_speed"] * times[:, None])
+    # Circular orbits (most moons) have E = M; only eccentric ones need Kepler's equation.
+    eccentric = task["eccentricity"] > 0
+    if eccentric.any():
+        anomaly[:, eccentric] = solve_kepler(anomaly[:, eccentric], task["eccentricity"][eccentric])
+    world = inclined_positions(
+        *(np.broadcast_to(task[name], shape).ravel() for name in ELEMENTS[:4]),
+        np.degrees(anomaly).ravel(),
+    ).reshape(shape + (3,))
+    parent, depth = task["parent"], task["depth"]
+    for level in range(int(depth.min()) + 1, int(depth.max()) + 1):
+        idx = np.flatnonzero(depth == level)
+        world[:, idx] += world[:, parent[idx]]
+    return world[:, task["output"]]
+
+
+def _run(job):
+    """Worker entry point: positions of one body group over one time chunk, as text for CSV."""
+    task, start, rate, k0, k1, fmt = job
+    times = sample_times(start, rate, k0, k1)
+    block = propagate(task, times)
+    if fmt != 'csv':
+        return block
+    # One string per sample time, so the writer can interleave groups in time order.
+    return [
+        "".join(f"{t!r},{field},{x:.12g},{y:.12g},{z:.12g}\n" for field, (x, y, z) in zip(task["fields"], rows))
+        for t, rows in zip(times.tolist(), block.tolist())
+    ]
+
+
+class CsvWriter:
+    """Long format: one time,body,x,y,z row per body and sample, in time order."""
+
+    def __init__(self, path, paths, times):
+        self._file = open(path, 'w', newline='')
+        self._file.write("time,body,x,y,z\n")
+
+    def write(self, k0, k1, parts):
+        self._file.writelines("".join(lines) for lines in zip(*parts))
+
+    def close(self):
+        self._file.close()
+
+
+class NpzWriter:
+    """
+    The same arrays as `--headless --output`: paths, time and positions of
+    shape (samples, bodies, 3). positions.npy is streamed into the archive
+    chunk by chunk, so the export never holds it in memory.
+    """
+
+    def __init__(self, path, paths, times):
+        self._zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED, allowZip64=True)
+        with self._zip.open('paths.npy', 'w') as f:
+            np.lib.format.write_array(f, np.array(paths))
+        with self._zip.open('time.npy', 'w', force_zip64=True) as f:
+            np.lib.format.write_array(f, times)
+        self._positions = self._zip.open('positions.npy', 'w', force_zip64=True)
+        np.lib.format.write_array_header_2_0(self._positions, {
+            'descr': np.lib.format.dtype_to_descr(np.dtype(np.float64)),
+            'fortran_order': False,
+            'shape': (len(times), len(paths), 3),
+        })
+
+    def write(self, k0, k1, parts):
+        self._positions.write(np.concatenate(parts, axis=1).tobytes())
+
+    def close(self):
+        self._positions.close()
+        self._zip.close()
+
+
+class ParquetWriter:
+    """Long format like CSV, one row group per chunk; body is dictionary-encoded."""
+
+    def __init__(self, path, paths, times):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet export needs pyarrow (pip install pyarrow)")
+        self._pa = pa
+        self._times = times
+        self._paths = pa.array(paths, type=pa.string())
+        self._schema = pa.schema([
+            ("time", pa.float64()), ("body", pa.dictionary(pa.int32(), pa.string())),
+            ("x", pa.float64()), ("y", pa.float64()), ("z", pa.float64()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, k0, k1, parts):
+        pa = self._pa
+        positions = np.concatenate(parts, axis=1)
+        n = positions.shape[1]
+        body = pa.DictionaryArray.from_arrays(np.tile(np.arange(n, dtype=np.int32), k1 - k0), self._paths)
+        xyz = positions.reshape(-1, 3)
+        self._writer.write_table(pa.table([
+            np.repeat(self._times[k0:k1], n), body, xyz[:, 0], xyz[:, 1], xyz[:, 2],
+        ], schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {'csv': CsvWriter, 'npz': NpzWriter, 'parquet': ParquetWriter}
+
+
+def export(scene_path, output, start, end, rate, fmt, jobs=os.cpu_count(), chunk_rows=CHUNK_ROWS):
+    """
+    Samples the world position of every body from start to end at rate
+    samples per simulated second and writes them to output.
+
+    Positions use the engine's Kepler propagation, the same ellipses the
+    app draws. Samples are produced in chunks of about chunk_rows
+    positions; each chunk is split into contiguous body groups that
+    workers propagate in parallel, and at most two chunks are in flight,
+    so memory stays bounded however long the span.
+    """
+    scene_data = load_scene(scene_path)
+    if scene_data.get("physics", "kepler") != "kepler":
+        print("Note: the scene uses n-body physics; exporting its Kepler ellipses")
+    sim = Simulation.from_scene(scene_data, workers=0)
+    sim.engine.set_physics("kepler")
+    engine, paths = sim.engine, sim.paths
+    n = engine.count
+
+    samples = int(np.floor((end - start) * rate + 1e-9)) + 1
+    times = sample_times(start, rate, 0, samples)
+    per_chunk = max(1, min(samples, chunk_rows // n))
+    group_size = -(-n // max(1, jobs))
+    tasks = [_group_task(engine, paths, b0, min(b0 + group_size, n)) for b0 in range(0, n, group_size)]
+
+    start_clock = time.perf_counter()
+    tmp_path = output + '.tmp'
+    writer = WRITERS[fmt](tmp_path, paths, times)
+    pool = ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) if jobs > 1 and len(tasks) > 1 else None
+    try:
+        pending = deque()
+        for k0 in range(0, samples, per_chunk):
+            k1 = min(k0 + per_chunk, samples)
+            work = [(task, start, rate, k0, k1, fmt) for task in tasks]
+            pending.append((k0, k1, [pool.submit(_run, job) for job in work] if pool else work))
+            if len(pending) > 1 or pool is None:
+                _write_chunk(writer, pending.popleft())
+        while pending:
+            _write_chunk(writer, pending.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        writer.close()
+    os.replace(tmp_path, output)
+
+    elapsed = time.perf_counter() - start_clock
+    print(f"Wrote {samples} samples of {n} bodies ({samples * n:,} positions) to {output} "
+          f"({os.path.getsize(output) / 2**20:.1f} MB) in {elapsed:.2f}s")
+
+
+def _write_chunk(writer, chunk):
+    k0, k1, work = chunk
+    parts = [w.result() if hasattr(w, 'result') else _run(w) for w in work]
+    writer.write(k0, k1, parts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export the world position of every body over a time span to CSV, NPZ or Parquet.")
+    parser.add_argument('scene', help="scene.json or a binary scene")
+    parser.add_argument('output', help="output file; the format follows its suffix unless --format is given")
+    parser.add_argument('--start', type=float, default=0.0, help="first sample time in simulated seconds")
+    parser.add_argument('--end', type=float, required=True, help="last sample time in simulated seconds")
+    parser.add_argument('--rate', type=float, default=1.0, help="samples per simulated second")
+    parser.add_argument('--format', choices=FORMATS)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help="positions computed per chunk; bounds memory use")
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if fmt not in FORMATS:
+        parser.error(f"cannot tell the format of {args.output}; use --format")
+    if args.end < args.start or args.rate <= 0:
+        parser.error("need --end >= --start and --rate > 0")
+    export(args.scene, args.output, args.start, args.end, args.rate, fmt, args.jobs, args.chunk_rows)
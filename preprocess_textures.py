@@ -0,0 +1,140 @@
+import argparse
+import hashlib
+import json
+import os
+
+from panda3d.core import Filename, PNMImage, Texture
+
+ROOT_DIR      = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR     = os.path.join(ROOT_DIR, 'assets', 'cache', 'textures')
+MANIFEST_NAME = 'manifest.json'
+CACHE_VERSION = 1
+
+COMPRESSION = {
+    'auto': None,
+    'none': Texture.CM_off,
+    'dxt1': Texture.CM_dxt1,
+    'dxt5': Texture.CM_dxt5,
+}
+
+
+def collect_scene_textures(scene_path):
+    """Returns every texture path referenced by scene.json, relative to the repo root."""
+    with open(scene_path, 'r') as f:
+        scene = json.load(f)
+
+    paths = []
+    stack = [scene]
+    while stack:
+        body = stack.pop()
+        for tex in (body.get('texture'),
+                    (body.get('rings') or {}).get('texture'),
+                    (body.get('overlay') or {}).get('texture')):
+            if tex and tex not in paths:
+                paths.append(tex)
+        stack.extend(body.get('children', []))
+
+    starfield = 'assets/textures/space.jpg'
+    if os.path.exists(os.path.join(ROOT_DIR, starfield)):
+        paths.append(starfield)
+    return paths
+
+
+def _largest_power_of_two(n):
+    return 1 << (max(n, 1).bit_length() - 1)
+
+
+def _source_hash(source, options):
+    h = hashlib.sha1()
+    h.update(json.dumps(options, sort_keys=True).encode())
+    with open(source, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def build_cached_texture(source, output_path, max_size, compression):
+    """Decodes source, resizes it to a power of two, bakes mipmaps and writes a .txo."""
+    img = PNMImage(Filename.fromOsSpecific(source))
+    width  = min(_largest_power_of_two(img.getXSize()), max_size)
+    height = min(_largest_power_of_two(img.getYSize()), max_size)
+    if (width, height) != (img.getXSize(), img.getYSize()):
+        scaled = PNMImage(width, height, img.getNumChannels(), img.getMaxval())
+        scaled.gaussianFilterFrom(1.0, img)
+        img = scaled
+
+    tex = Texture(os.path.basename(source))
+    tex.load(img)
+    tex.setMinfilter(Texture.FT_linear_mipmap_linear)
+    tex.generateRamMipmapImages()
+    if compression is None:
+        compression = Texture.CM_dxt5 if img.hasAlpha() else Texture.CM_dxt1
+    if compression != Texture.CM_off:
+        if not tex.compressRamImage(compression, Texture.QL_default, None):
+            print(f"  compression unavailable, storing {source} uncompressed")
+
+    if not tex.write(Filename.fromOsSpecific(output_path)):
+        raise IOError(f"Could not write {output_path}")
+    return width, height
+
+
+def preprocess_textures(sources, cache_dir=CACHE_DIR, max_size=4096, compression='auto', force=False):
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    manifest = {'version': CACHE_VERSION, 'textures': {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            old = json.load(f)
+        if old.get('version') == CACHE_VERSION:
+            manifest = old
+
+    options = {'max_size': max_size, 'compression': compression}
+    for rel_source in sources:
+        source = os.path.join(ROOT_DIR, rel_source)
+        if not os.path.exists(source):
+            print(f"Skipping missing texture {rel_source}")
+            continue
+
+        digest = _source_hash(source, options)
+        stem = os.path.splitext(os.path.basename(source))[0]
+        output_path = os.path.join(cache_dir, f"{stem}-{digest}.txo")
+        key = os.path.relpath(source, cache_dir)
+
+        entry = manifest['textures'].get(key)
+        if entry and entry['hash'] == digest and os.path.exists(output_path) and not force:
+            print(f"Up to date: {rel_source}")
+        else:
+            if entry and entry['cache'] != os.path.basename(output_path):
+                stale = os.path.join(cache_dir, entry['cache'])
+                if os.path.exists(stale):
+                    os.remove(stale)
+            width, height = build_cached_texture(source, output_path, max_size, COMPRESSION[compression])
+            print(f"Built {rel_source} -> {os.path.basename(output_path)} ({width}x{height}, {compression})")
+
+        st = os.stat(source)
+        manifest['textures'][key] = {
+            'hash': digest,
+            'cache': os.path.basename(output_path),
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+        }
+
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bake scene textures into mipmapped, compressed .txo files.")
+    parser.add_argument('textures', nargs='*', help="texture paths relative to the repo root (default: all used by the scene)")
+    parser.add_argument('--scene', default=os.path.join(ROOT_DIR, 'sim', 'scene.json'))
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--max-size', type=int, default=4096, help="clamp width and height to this power of two")
+    parser.add_argument('--compression', choices=sorted(COMPRESSION), default='auto',
+                        help="auto picks dxt5 for textures with alpha and dxt1 otherwise")
+    parser.add_argument('--force', action='store_true', help="rebuild even if the cache is up to date")
+    args = parser.parse_args()
+
+    sources = args.textures or collect_scene_textures(args.scene)
+    preprocess_textures(sources, args.cache_dir, args.max_size, args.compression, args.force)
@@ -1,6 +1,10 @@
-import math
-import json
+import argparse
 import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from direct.showbase.ShowBase import ShowBase
 from panda3d.core import (
@@ -8,18 +12,25 @@ from panda3d.core import (
     AmbientLight,
     TextureStage,
     Texture,
-    GeomVertexData,
     GeomVertexFormat,
-    GeomVertexWriter,
-    GeomTriangles,
     Geom,
     GeomNode,
-    CullFaceAttrib
+    CullFaceAttrib,
+    TextNode
 )
+from direct.gui.OnscreenText import OnscreenText
 
 from core.scene_manager import SceneManager
 from core.camera_controller import CameraController
 from core.input_handler import InputHandler
+from core.depth_slices import DepthSlices
+from core.texture_manager import TextureManager, STARFIELD_OWNER
+from core.asset_loader import AssetLoader
+from core.scene_watcher import SceneWatcher
+from core.scene_file import load_scene
+from core.profiler import profiler
+from utils.geom_arrays import grid_triangles, make_triangles, make_vertex_data
+from utils.mesh_cache import mesh_cache
 
 loadPrcFileData('', 'window-title Solar System Sandbox')
 loadPrcFileData('', 'show-frame-rate-meter 1')
@@ -27,51 +38,54 @@ loadPrcFileData('', 'show-frame-rate-meter 1')
 
 def _make_sky_sphere(radius=1500, lat_steps=16, long_steps=32):
     """Gera uma esfera interna (skydome) com UVs de 0→1."""
-    fmt    = GeomVertexFormat.get_v3t2()
-    vdata  = GeomVertexData('sky', fmt, Geom.UHStatic)
-    vwriter = GeomVertexWriter(vdata, 'vertex')
-    uvwriter= GeomVertexWriter(vdata, 'texcoord')
-    for i in range(lat_steps + 1):
-        phi = math.pi * i / lat_steps
-        v   = 1 - i / lat_steps
-        for j in range(long_steps + 1):
-            theta = 2 * math.pi * j / long_steps
-            u     = j / long_steps
-            x = radius * math.sin(phi) * math.cos(theta)
-            y = radius * math.sin(phi) * math.sin(theta)
-            z = radius * math.cos(phi)
-            vwriter.add_data3(x, y, z)
-            uvwriter.add_data2(u, v)
-
-    tris = GeomTriangles(Geom.UHStatic)
-    stride = long_steps + 1
-    for i in range(lat_steps):
-        for j in range(long_steps):
-            v0 =  i    * stride + j
-            v1 =  i    * stride + (j+1)
-            v2 = (i+1) * stride + j
-            v3 = (i+1) * stride + (j+1)
-            tris.add_vertices(v0, v2, v1)
-            tris.add_vertices(v1, v2, v3)
-
+    phi   = np.pi * np.arange(lat_steps + 1) / lat_steps
+    theta = 2 * np.pi * np.arange(long_steps + 1) / long_steps
+    u, v  = np.meshgrid(np.arange(long_steps + 1) / long_steps, 1 - np.arange(lat_steps + 1) / lat_steps)
+
+    x = radius * np.sin(phi)[:, None] * np.cos(theta)
+    y = radius * np.sin(phi)[:, None] * np.sin(theta)
+    z = np.broadcast_to((radius * np.cos(phi))[:, None], x.shape)
+
+    vdata = make_vertex_data('sky', GeomVertexFormat.get_v3t2(), {
+        'vertex': np.stack((x, y, z), axis=-1).reshape(-1, 3),
+        'texcoord': np.stack((u.ravel(), v.ravel()), axis=1),
+    })
     geom = Geom(vdata)
-    geom.add_primitive(tris)
-    node = GeomNode('skydome')
-    node.add_geom(geom)
-    return node
+    geom.add_primitive(make_triangles(grid_triangles(lat_steps, long_steps)))
+    return geom
 
 
 class SolarSystemApp(ShowBase):
-    def __init__(self):
+    """
+    The sandbox. interactive=False builds the same scene and renderer
+    without camera controls, input or the scene.json watcher, for tools
+    that drive the camera and the frames themselves, like benchmark.py.
+    With window-type none there is nothing to draw into, so the depth
+    slices and the skydome are skipped.
+    """
+
+    def __init__(self, scene_path, interactive=True):
         super().__init__()
         self._mouse_enabled = False
         self._frozen_time = False
         self._speed_factor = 0.5
 
         self.setBackgroundColor(0, 0, 0, 1)
-        self.scene_data = self.load_scene_data("scene.json")
-
+        self.scene_data = load_scene(scene_path)
+
+        self.loading_text = OnscreenText(
+            text="",
+            pos=(-1.29, 0.9),
+            scale=0.05,
+            fg=(1, 1, 1, 1),
+            align=TextNode.ALeft,
+            mayChange=True,
+        )
+        profiler.attach(self)
+        self.texture_manager = TextureManager()
+        self.asset_loader = AssetLoader(self, self.texture_manager, on_progress=self._on_asset_progress)
         self.scene_manager = SceneManager(self)
+        self.depth_slices = DepthSlices(self, visibility=self.scene_manager.visibility) if self.win else None
         self.scene_manager.build_scene(self.scene_data)
         
         self.alight = AmbientLight('alight')
@@ -79,28 +93,35 @@ class SolarSystemApp(ShowBase):
         self.alnp = self.render.attachNewNode(self.alight)
         self.render.setLight(self.alnp)
         
+        if self.depth_slices is not None:
+            self._build_starfield()
+        if not interactive:
+            self.disableMouse()
+            return
+
         self.camera_controller = CameraController(self)
         self.input_handler = InputHandler(self, self.camera_controller)
-
-        self._build_starfield()
         self.input_handler.reset_camera()
+        self.scene_watcher = SceneWatcher(scene_path)
+        self.scene_watcher.start()
         self.taskMgr.add(self.watch_json_file, 'watch_json_updates')
-        self.last_mtime = None
-
-    def load_scene_data(self, filename):
-        path = os.path.join(os.path.dirname(__file__), filename)
-        with open(path, 'r') as f:
-            return json.load(f)
 
     def _build_starfield(self):
-        """Create an inside-out procedural skydome textured with stars."""
-        dome_np = self.render.attach_new_node(_make_sky_sphere())
+        """Create an inside-out procedural skydome textured with stars, drawn behind every depth slice."""
+        dome_np = self.depth_slices.background.attach_new_node(
+            mesh_cache.make_node('skydome', _make_sky_sphere, 1500, 16, 32)
+        )
         dome_np.setLightOff()
         dome_np.setBin("background", 0)
         dome_np.setDepthWrite(False)
         dome_np.setAttrib(CullFaceAttrib.make(CullFaceAttrib.MCullNone))
 
-        stars = loader.loadTexture("../assets/textures/space.jpg")
+        self.asset_loader.request_texture(
+            "../assets/textures/space.jpg", STARFIELD_OWNER,
+            lambda stars: self._apply_starfield_texture(dome_np, stars),
+        )
+
+    def _apply_starfield_texture(self, dome_np, stars):
         stars.setMinfilter(Texture.FTLinearMipmapLinear)
         stars.setWrapU(Texture.WMRepeat)
         stars.setWrapV(Texture.WMClamp)
@@ -110,24 +131,40 @@ class SolarSystemApp(ShowBase):
         dome_np.setTexture(ts, stars)
         dome_np.setTexScale(ts, 1, 1)
         dome_np.setTexOffset(ts, 0.5, 0)
+
+    def _on_asset_progress(self, done, total):
+        if done < total:
+            self.loading_text.setText(f"Loading textures: {done}/{total}")
+        else:
+            self.loading_text.setText("")
         
     def watch_json_file(self, task):
-        try:
-            current_mtime = os.path.getmtime("sim/scene.json")
-            if self.last_mtime is None:
-                self.last_mtime = current_mtime
-                return
-            if self.last_mtime is None or current_mtime != self.last_mtime:
-                print("Change found")
-                self.last_mtime = current_mtime
-                self.render.get_children().detach()
-                self._build_starfield()
-                self.scene_data = self.load_scene_data("scene.json")
-                self.scene_manager.build_scene(self.scene_data)
-        except Exception as e:
-            print(f"Error reading file: {e}")
+        scene_data = self.scene_watcher.poll()
+        if scene_data is not None:
+            print("Change found")
+            self.scene_data = scene_data
+            self.scene_manager.update_scene(self.scene_data)
         return task.cont
 
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m sim", description="Solar System Sandbox")
+    parser.add_argument('--headless', action='store_true', help="run the simulation without opening a window")
+    parser.add_argument('--scene', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "scene.json"),
+                        help="scene.json, or a binary scene written by convert_scene.py")
+    parser.add_argument('--steps', type=int, default=1_000_000, help="fixed steps to run in headless mode")
+    parser.add_argument('--dt', type=float, default=None, help="fixed timestep in simulated seconds")
+    parser.add_argument('--sample-every', type=int, default=1000, help="steps between samples written to --output")
+    parser.add_argument('--output', help="write sampled world positions to this .npz file")
+    parser.add_argument('--record', metavar='DIR', help="record the headless run for replay (F6 in the app)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="processes for n-body force evaluation (default: the scene's \"workers\" key)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    app = SolarSystemApp()
-    app.run()
\ No newline at end of file
+    args = parse_args()
+    if args.headless:
+        from core.simulation import run_headless
+        run_headless(args.scene, args.steps, args.dt, args.sample_every, args.output, args.workers, args.record)
+    else:
+        app = SolarSystemApp(args.scene)
+        app.run()
\ No newline at end of file
@@ -11,8 +11,10 @@ def load_scene_data(filename):
 
 def save_scene_data(filename, data):
     path = os.path.join(os.path.dirname(__file__), "..", filename)
-    with open(path, 'w') as f:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
         json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
     
 def add_moon_to_planet(scene_data, planet_name):
     for i, obj in enumerate(scene_data.copy()["children"]):
@@ -0,0 +1,86 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from panda3d.core import Filename, TexturePool
+
+from core.profiler import profiler
+
+
+class AssetLoader:
+    """
+    Decodes textures on a thread pool and hands them to their callers on the
+    main thread, so bodies can appear immediately with a placeholder look and
+    swap their textures in as they finish.
+
+    on_progress(done, total) is called after every completed request of the
+    current batch; last_load_time holds the wall time of the last batch.
+    """
+
+    def __init__(self, app, texture_manager, workers=4, on_progress=None):
+        self.app = app
+        self.texture_manager = texture_manager
+        self.on_progress = on_progress
+        self.total = 0
+        self.done = 0
+        self.last_load_time = None
+        self._batch_start = None
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asset-loader")
+        app.taskMgr.add(self._apply_task, "apply_loaded_assets")
+
+    def request_texture(self, path, owner, apply):
+        """Calls apply(texture) on the main thread once the texture is resident."""
+        texture = self.texture_manager.get_cached(path, owner)
+        if texture is not None:
+            apply(texture)
+            return
+
+        key = self.texture_manager.resolve(path)
+        if self._batch_start is None:
+            self._batch_start = time.perf_counter()
+        self.total += 1
+        if key not in self._pending:
+            source = self.texture_manager.load_path(key)
+            future = self._executor.submit(self._load, source)
+            self._pending[key] = (future, [])
+        self._pending[key][1].append((owner, apply))
+
+    @staticmethod
+    def _load(source):
+        with profiler.span("texture load"):
+            return TexturePool.loadTexture(Filename(source))
+
+    def cancel(self, owner):
+        """Drops every pending request made by owner."""
+        for _, waiters in self._pending.values():
+            kept = [w for w in waiters if w[0] != owner]
+            self.total -= len(waiters) - len(kept)
+            waiters[:] = kept
+
+    @property
+    def busy(self):
+        return bool(self._pending)
+
+    def _apply_task(self, task):
+        finished = [key for key, (future, _) in self._pending.items() if future.done()]
+        for key in finished:
+            future, waiters = self._pending.pop(key)
+            texture = future.result()
+            if texture is None:
+                print(f"Could not load texture: {key}")
+            for owner, apply in waiters:
+                self.done += 1
+                if texture is not None:
+                    apply(self.texture_manager.adopt(key, texture, owner))
+            if self.on_progress:
+                self.on_progress(self.done, self.total)
+
+        if self._batch_start is not None and not self._pending:
+            self.last_load_time = time.perf_counter() - self._batch_start
+            print(f"Loaded {self.total} textures in {self.last_load_time:.2f}s")
+            self._batch_start = None
+            self.total = self.done = 0
+        return task.cont
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
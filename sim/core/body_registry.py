@@ -0,0 +1,90 @@
+import numpy as np
+
+from core.orbit_engine import OrbitEngine
+
+
+class BodyRegistry(OrbitEngine):
+    """
+    OrbitEngine that also owns every per-body scalar the renderer needs, so
+    bodies are rows in shared arrays rather than Python objects with a
+    __dict__ each. CelestialBody is only a __slots__ view onto its row.
+
+    Slots move when bodies are removed (the last row fills the hole), so
+    every body also gets a stable integer id that is never reused; ids are
+    what scene-graph tags and external references should store.
+    """
+
+    _FIELDS = OrbitEngine._FIELDS + ("radius", "extent")
+    _INT_FIELDS = OrbitEngine._INT_FIELDS + ("body_id", "kind")
+
+    def __init__(self, capacity=64):
+        super().__init__(capacity)
+        self.kinds = []
+        self._slot_by_id = {}
+        self._next_id = 1
+
+    def kind_code(self, kind):
+        """Interns a scene.json "type" string as a small integer."""
+        if kind not in self.kinds:
+            self.kinds.append(kind)
+        return self.kinds.index(kind)
+
+    def add_body(self, body, kind="planet", radius=0.0, parent=None, mass=None, extent=None, **elements):
+        """
+        Adds a row for body and returns its slot; elements are the
+        add_orbit() keyword arguments. parent is the parent body or None.
+        extent is how far the body's own geometry (rings, overlay, a belt's
+        rocks) reaches from its centre, the radius by default.
+        Sets body.id and body._orbit_index.
+        """
+        i = self.add_orbit(
+            parent=parent._orbit_index if parent is not None else -1,
+            body=body,
+            mass=mass,
+            **elements,
+        )
+        body_id = self._next_id
+        self._next_id += 1
+        self.radius[i]  = radius
+        self.extent[i]  = radius if extent is None else extent
+        self.kind[i]    = self.kind_code(kind)
+        self.body_id[i] = body_id
+        self._slot_by_id[body_id] = i
+        body.id = body_id
+        body._orbit_index = i
+        return i
+
+    def remove(self, i):
+        removed, last = int(self.body_id[i]), self.count - 1
+        super().remove(i)
+        self._slot_by_id.pop(removed, None)
+        if i != last:
+            self._slot_by_id[int(self.body_id[i])] = i
+
+    def clear(self):
+        super().clear()
+        self._slot_by_id = {}
+
+    def get(self, body_id):
+        """The body with a stable id, or None if it has been removed."""
+        i = self._slot_by_id.get(body_id)
+        return self.bodies[i] if i is not None else None
+
+    def bodies_of_kind(self, kind):
+        """Every body whose scene.json "type" is kind."""
+        if kind not in self.kinds:
+            return []
+        slots = np.flatnonzero(self.kind[:self.count] == self.kinds.index(kind))
+        return [self.bodies[i] for i in slots]
+
+    def nearest(self, point, kind=None):
+        """The body whose surface is closest to a render-space point, optionally of one kind."""
+        n = self.count
+        if not n:
+            return None
+        distance = np.linalg.norm(self.world_positions() - np.asarray(point, dtype=np.float64), axis=1)
+        distance -= self.radius[:n]
+        if kind is not None:
+            distance[self.kind[:n] != (self.kinds.index(kind) if kind in self.kinds else -1)] = np.inf
+        i = int(np.argmin(distance))
+        return self.bodies[i] if np.isfinite(distance[i]) else None
@@ -37,6 +37,7 @@ class CameraController:
             align=TextNode.ALeft,
             mayChange=True,
         )
+        self._coord_text = "Pos:"
         self.set_mouse_enabled(False)
 
         app.taskMgr.add(self.update_camera, "free_fly_camera")
@@ -95,7 +96,11 @@ class CameraController:
             if self.keys["space"]:
                 self.camera.setZ(self.camera,  self.speed * dt)
 
-            pos = self.camera.getPos()
-            self.coord_text.setText(f"Pos: X={pos.x:.1f}, Y={pos.y:.1f}, Z={pos.z:.1f}")
+            x, y, z = self.app.scene_manager.floating_origin.camera_world()
+            text = f"Pos: X={x:.1f}, Y={y:.1f}, Z={z:.1f}"
+            # Setting the text regenerates its glyph geometry, so only do it on a change.
+            if text != self._coord_text:
+                self._coord_text = text
+                self.coord_text.setText(text)
 
         return Task.cont
@@ -0,0 +1,100 @@
+import math
+
+from panda3d.core import Camera, ConfigVariableDouble, NodePath
+
+view_near = ConfigVariableDouble(
+    'sim-view-near', 0.01,
+    'Nearest distance the camera draws, in scene units.'
+)
+view_far = ConfigVariableDouble(
+    'sim-view-far', 1e7,
+    'Farthest distance the camera draws, in scene units.'
+)
+slice_ratio = ConfigVariableDouble(
+    'sim-depth-slice-ratio', 1e4,
+    'Largest far/near ratio of one depth slice; lower means more depth precision and more slices.'
+)
+
+BACKGROUND_FAR = 1e5
+# After the camera tasks and the visibility pass, before igLoop (sort 50) renders.
+TASK_SORT      = 20
+
+
+class DepthSlices:
+    """
+    Draws the view as several depth slices, back to front.
+
+    One 24-bit depth buffer cannot resolve both a close-up of a small moon
+    and bodies millions of units away. The range from view_near to
+    view_far is cut into slices of equal far/near ratio, each with its own
+    camera (a copy of the main lens with that near/far) and display
+    region that clears depth before drawing; farther slices draw first.
+    The nearest slice is the main camera itself, so code using camLens,
+    like picking rays, is unaffected. Slices outside the depth range of
+    this frame's visible bodies, according to the VisibilityScheduler,
+    are switched off.
+
+    background is a separate scene graph drawn behind every slice by a
+    camera that copies only the main camera's rotation, so a skydome
+    parented to it stays at infinity whatever the scene's scale.
+    """
+
+    def __init__(self, app, visibility=None, near=None, far=None, ratio=None):
+        self.app = app
+        self.visibility = visibility
+        self.near = near or view_near.getValue()
+        self.far = far or view_far.getValue()
+        count = max(1, math.ceil(math.log(self.far / self.near) / math.log(ratio or slice_ratio.getValue())))
+        edges = [self.near * (self.far / self.near) ** (k / count) for k in range(count + 1)]
+        self.ranges = list(zip(edges[:-1], edges[1:]))
+        if visibility is not None:
+            visibility.view_range = (self.near, self.far)
+
+        main_lens = app.camLens
+        main_lens.setNearFar(*self.ranges[0])
+        main_region = app.camNode.getDisplayRegion(0)
+        main_region.setClearDepthActive(True)
+        self._dimensions = main_region.getDimensions()
+        sort = main_region.getSort()
+
+        self._lenses = []
+        self.regions = [main_region]
+        for k, (near_k, far_k) in enumerate(self.ranges[1:], 1):
+            camera = app.camera.attachNewNode(Camera(f"depth-slice-{k}", self._copy_lens(near_k, far_k)))
+            self.regions.append(self._make_region(camera, sort - k))
+
+        self.background = NodePath("background")
+        self._background_camera = self.background.attachNewNode(
+            Camera("background", self._copy_lens(1.0, BACKGROUND_FAR)))
+        self._make_region(self._background_camera, sort - len(self.ranges))
+
+        self._fov = None
+        app.taskMgr.add(self.update_task, "depth-slices", sort=TASK_SORT)
+
+    def _copy_lens(self, near, far):
+        lens = self.app.camLens.makeCopy()
+        lens.setNearFar(near, far)
+        self._lenses.append(lens)
+        return lens
+
+    def _make_region(self, camera, sort):
+        region = self.app.win.makeDisplayRegion(*self._dimensions)
+        region.setSort(sort)
+        region.setClearDepthActive(True)
+        region.setCamera(camera)
+        return region
+
+    def update_task(self, task):
+        main_lens = self.app.camLens
+        fov = main_lens.getFov()
+        if fov != self._fov:
+            # The window's aspect ratio is only ever applied to the main lens.
+            for lens in self._lenses:
+                lens.setFov(fov)
+            self._fov = fov
+        self._background_camera.setQuat(self.app.cam.getQuat(self.app.render))
+
+        extent = self.visibility.depth_extent if self.visibility is not None else None
+        for region, (near, far) in zip(self.regions[1:], self.ranges[1:]):
+            region.setActive(extent is None or (extent[0] < far and extent[1] > near))
+        return task.cont
@@ -0,0 +1,78 @@
+import numpy as np
+from panda3d.core import ConfigVariableDouble
+
+rebase_distance = ConfigVariableDouble(
+    'sim-origin-rebase-distance', 1000.0,
+    'Distance the focused body, or the camera, may stray from the render origin before the origin re-centres on it.'
+)
+
+
+class FloatingOrigin:
+    """
+    Keeps render space centred on the viewer.
+
+    The engine holds every position in float64 world coordinates, while
+    Panda3D transforms are single precision, so far from the world origin
+    nodes and the camera would jitter. Body nodes are therefore flat
+    children of render whose positions are written as world - origin,
+    subtracted in float64, and the origin re-centres on the focused body,
+    or on the camera when nothing is focused, once it strays
+    rebase_distance from it. Only differences near the viewer ever reach
+    float32.
+
+    Things fixed in world space rather than tied to a body, like the sun's
+    light, go under world_np, which sits at -origin; the camera is moved
+    along on every shift so the view does not jump.
+    """
+
+    def __init__(self, app, engine):
+        self.app = app
+        self.engine = engine
+        self.origin = np.zeros(3)
+        # Bumped on every shift, so cached render-space positions know they are stale.
+        self.version = 0
+        self.focus = None
+        self.world_np = app.render.attachNewNode("world-anchor")
+        app.world_np = self.world_np
+
+    def to_render(self, world):
+        """Render-space position(s) of float64 world position(s)."""
+        return np.asarray(world, dtype=np.float64) - self.origin
+
+    def to_world(self, point):
+        """World position of a render-space point, e.g. a picking ray's origin."""
+        return np.asarray(tuple(point), dtype=np.float64) + self.origin
+
+    def camera_world(self):
+        return self.to_world(self.app.camera.getPos(self.app.render))
+
+    def shift(self, origin):
+        """Moves the render origin to a world position, carrying the camera and world_np along."""
+        origin = np.asarray(origin, dtype=np.float64)
+        delta = origin - self.origin
+        if not delta.any():
+            return
+        self.origin = origin
+        self.version += 1
+        self.world_np.setPos(*(-origin))
+        camera = getattr(self.app, "camera", None)
+        if camera is not None:
+            camera.setPos(self.app.render, camera.getPos(self.app.render) - tuple(delta))
+
+    def update(self, follow_focus=True):
+        """
+        Re-centres on the focused body, or on the camera, if it has strayed
+        too far. A replay passes follow_focus=False, as the engine does not
+        know where the replayed body is.
+        """
+        focus = self.focus
+        if focus is not None and focus._orbit_index is None:
+            focus = self.focus = None
+        if focus is not None and follow_focus:
+            target = self.engine.world_position_of(focus._orbit_index)
+        elif getattr(self.app, "camera", None) is not None:
+            target = self.camera_world()
+        else:
+            return
+        if np.linalg.norm(target - self.origin) > rebase_distance.getValue():
+            self.shift(target)
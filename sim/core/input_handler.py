@@ -1,7 +1,10 @@
 import math
 import sys
 from direct.gui.DirectGui import DirectButton
-from panda3d.core import CollisionTraverser, CollisionNode, CollisionRay, CollisionHandlerQueue, BitMask32, Vec3
+from panda3d.core import Point2, Point3, Vec3
+
+HOVER_COLOR_SCALE = (1.6, 1.6, 1.6, 1)
+REPLAY_SPEEDS     = (-16, -4, -1, -0.25, 0.25, 1, 4, 16)
 
 
 class InputHandler:
@@ -15,41 +18,54 @@ class InputHandler:
         self.orbit_heading = 0.0
         self.orbit_pitch = 20.0
 
-        self.picker = CollisionTraverser()
-        self.pq = CollisionHandlerQueue()
-        self.picker_node = CollisionNode('mouseRay')
-        self.picker_np = self.app.camera.attachNewNode(self.picker_node)
-        self.picker_node.setIntoCollideMask(BitMask32.allOff())
-        self.picker_ray = CollisionRay()
-        self.picker_node.addSolid(self.picker_ray)
-        self.picker.addCollider(self.picker_np, self.pq)
-        
+        self.hovered = None
+
         app.accept("r", self.reset_camera)
         app.accept("v", self.toggle_speed)
         app.accept("p", self.freeze_time)
         app.accept("escape", self.pause)
         app.accept('mouse1', self.focus_on_planet)
+        app.accept("f5", self.toggle_recording)
+        app.accept("f6", self.toggle_replay)
+        app.accept("f7", self.resume_from_replay)
+        app.accept("[", self.scrub, [-1])
+        app.accept("]", self.scrub, [1])
+        app.accept("o", self.toggle_orbit_paths)
 
         app.taskMgr.add(self.update_orbit_camera, "orbit_camera_task")
+        app.taskMgr.add(self.update_hover, "hover_highlight_task")
+
+    def pick_body(self):
+        """The body under the crosshair, looked up in the scene manager's picking index."""
+        near, far = Point3(), Point3()
+        if not self.app.camLens.extrude(Point2(0, 0), near, far):
+            return None
+        origin = self.app.render.getRelativePoint(self.app.cam, near)
+        direction = self.app.render.getRelativePoint(self.app.cam, far) - origin
+        return self.app.scene_manager.body_at(origin, direction)
 
     def focus_on_planet(self):
         if not self.app.mouseWatcherNode.hasMouse():
             return
 
-        self.picker_ray.setFromLens(self.app.camNode, 0, 0)
-
-        self.picker.traverse(render)
-        if self.pq.getNumEntries() > 0:
-            self.pq.sortEntries()
-            for entry in self.pq.getEntries():
-                np = entry.getIntoNodePath()
-                if np.hasTag("planet"):
-                    self.planet_np = np
-                    self.orbiting = True
-                    self.camera_controller.set_mouse_enabled(True)
-                    self.orbit_heading = 0.0
-                    self.orbit_pitch = 20.0
-                    return
+        body = self.pick_body()
+        if body is not None:
+            self.planet_np = body.node
+            self.app.scene_manager.floating_origin.focus = body
+            self.orbiting = True
+            self.camera_controller.set_mouse_enabled(True)
+            self.orbit_heading = 0.0
+            self.orbit_pitch = 20.0
+
+    def update_hover(self, task):
+        body = self.pick_body() if self.app.mouseWatcherNode.hasMouse() else None
+        if body is not self.hovered:
+            if self.hovered is not None and not self.hovered.node.isEmpty():
+                self.hovered.model.clearColorScale()
+            if body is not None:
+                body.model.setColorScale(*HOVER_COLOR_SCALE)
+            self.hovered = body
+        return task.cont
 
     def update_orbit_camera(self, task):
         if self.orbiting and self.app.mouseWatcherNode.hasMouse():
@@ -78,6 +94,38 @@ class InputHandler:
     
     def freeze_time(self):
         self.app._frozen_time = not self.app._frozen_time
+
+    def toggle_recording(self):
+        scene_manager = self.app.scene_manager
+        if scene_manager.recorder is None:
+            scene_manager.start_recording()
+        else:
+            scene_manager.stop_recording()
+
+    def toggle_replay(self):
+        scene_manager = self.app.scene_manager
+        if scene_manager.replay is None:
+            scene_manager.start_replay()
+        else:
+            scene_manager.stop_replay()
+
+    def resume_from_replay(self):
+        """Leaves the replay and continues the simulation from the recorded moment on screen."""
+        if self.app.scene_manager.replay is not None:
+            self.app.scene_manager.stop_replay(resume=True)
+
+    def toggle_orbit_paths(self):
+        self.app.scene_manager.orbit_paths.toggle()
+
+    def scrub(self, direction):
+        """Steps the replay speed through REPLAY_SPEEDS; negative speeds play backwards."""
+        replay = self.app.scene_manager.replay
+        if replay is None:
+            return
+        speeds = list(REPLAY_SPEEDS)
+        index = min(range(len(speeds)), key=lambda k: abs(speeds[k] - replay.speed))
+        replay.speed = speeds[min(max(index + direction, 0), len(speeds) - 1)]
+        print(f"Replay speed {replay.speed:g}x")
     
     def pause(self):
         self.camera_controller.set_mouse_enabled(True)
@@ -109,5 +157,10 @@ class InputHandler:
 
     def reset_camera(self):
         self.camera_controller.center_mouse()
+        self.orbiting = False
+        self.planet_np = None
+        floating_origin = self.app.scene_manager.floating_origin
+        floating_origin.focus = None
+        floating_origin.shift((0, 0, 0))
         self.app.camera.setPos(0, -30, 5)
         self.app.camera.lookAt(0, 0, 0)
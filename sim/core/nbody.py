@@ -0,0 +1,297 @@
+import numpy as np
+
+# Masses are stored as gravitational parameters (G * m), so G never appears.
+# Softening must stay positive: it is also what zeroes a body's pull on itself.
+DEFAULT_THETA     = 0.5
+DEFAULT_SOFTENING = 0.01
+LEAF_SIZE         = 8
+LEAF_MASS_RATIO   = 1e-9
+# A derived mass is raised until its satellites reach no further than this
+# fraction of its Hill radius, but never past MAX_MASS_RATIO of its own
+# parent's, or the planets would pull each other's moons away instead.
+HILL_FRACTION     = 0.4
+MAX_MASS_RATIO    = 0.01
+
+
+class Octree:
+    """
+    Barnes–Hut octree over a set of point masses, stored as flat arrays.
+
+    Bodies are reordered so every node owns a contiguous range of `order`,
+    which lets leaves be evaluated as array slices.
+    """
+
+    def __init__(self, positions, masses, leaf_size=LEAF_SIZE):
+        n = len(positions)
+        lo = positions.min(axis=0)
+        hi = positions.max(axis=0)
+        center = (lo + hi) / 2
+        half = max(float((hi - lo).max()) / 2, 1e-9) * 1.0001
+
+        self.order = np.arange(n)
+        coms, node_mass, sizes, starts, ends, children = [], [], [], [], [], []
+
+        # Each entry: (node id, start, end, center, half)
+        stack = [(0, 0, n, center, half)]
+        coms.append(None); node_mass.append(0.0); sizes.append(0.0)
+        starts.append(0); ends.append(n); children.append(None)
+        while stack:
+            node, start, end, center, half = stack.pop()
+            idx = self.order[start:end]
+            m = masses[idx]
+            total = m.sum()
+            node_mass[node] = total
+            coms[node] = (positions[idx] * m[:, None]).sum(axis=0) / total if total > 0 else center
+            sizes[node] = 2 * half
+
+            if end - start <= leaf_size or half < 1e-9:
+                continue
+
+            octant = (
+                (positions[idx, 0] > center[0]).astype(np.int64)
+                | (positions[idx, 1] > center[1]).astype(np.int64) << 1
+                | (positions[idx, 2] > center[2]).astype(np.int64) << 2
+            )
+            sort = np.argsort(octant, kind="stable")
+            self.order[start:end] = idx[sort]
+            bounds = np.searchsorted(octant[sort], np.arange(9))
+
+            kids = []
+            for o in range(8):
+                c_start, c_end = start + bounds[o], start + bounds[o + 1]
+                if c_start == c_end:
+                    continue
+                offset = np.array([(o & 1) * 2 - 1, (o >> 1 & 1) * 2 - 1, (o >> 2 & 1) * 2 - 1])
+                child = len(coms)
+                coms.append(None); node_mass.append(0.0); sizes.append(0.0)
+                starts.append(c_start); ends.append(c_end); children.append(None)
+                kids.append(child)
+                stack.append((child, c_start, c_end, center + offset * half / 2, half / 2))
+            children[node] = kids
+
+        self.com      = np.array(coms)
+        self.mass     = np.array(node_mass)
+        self.size     = np.array(sizes)
+        self.start    = np.array(starts)
+        self.end      = np.array(ends)
+        self.children = children
+
+
+def accelerations(positions, masses, theta=DEFAULT_THETA, softening=DEFAULT_SOFTENING, targets=None):
+    """
+    Barnes–Hut accelerations in O(n log n), for every body or only for the
+    slots in targets (the result then has one row per target).
+
+    The tree is walked once with groups of bodies: each node receives the
+    bodies for which it is too close to be approximated, accepts the ones
+    that now satisfy size / distance < theta as a single monopole, and
+    passes the rest to its children. Leaves are summed directly.
+    """
+    n = len(positions)
+    targets = np.arange(n) if targets is None else np.asarray(targets)
+    acc = np.zeros((len(targets), 3))
+    if n < 2 or not len(targets):
+        return acc
+
+    tree = Octree(positions, masses)
+    eps2 = softening * softening
+    theta2 = theta * theta
+
+    # Each entry carries rows of acc and the matching positions, gathered once.
+    stack = [(0, np.arange(len(targets)), positions[targets])]
+    while stack:
+        node, rows, pos = stack.pop()
+        kids = tree.children[node]
+        if kids is None:
+            members = tree.order[tree.start[node]:tree.end[node]]
+            d = positions[members][None, :, :] - pos[:, None, :]
+            r2 = np.einsum('ijk,ijk->ij', d, d) + eps2
+            w = masses[members][None, :] / (r2 * np.sqrt(r2))
+            acc[rows] += np.einsum('ijk,ij->ik', d, w)
+            continue
+
+        d = tree.com[node] - pos
+        r2 = np.einsum('ij,ij->i', d, d) + eps2
+        far = tree.size[node] ** 2 < theta2 * r2
+        if far.any():
+            r2_far = r2[far]
+            acc[rows[far]] += d[far] * (tree.mass[node] / (r2_far * np.sqrt(r2_far)))[:, None]
+            near = ~far
+            rows, pos = rows[near], pos[near]
+        if rows.size:
+            for child in kids:
+                stack.append((child, rows, pos))
+    return acc
+
+
+class NBodyIntegrator:
+    """
+    Kick-drift-kick leapfrog integrator for mutual gravity between all bodies.
+
+    Positions and velocities are absolute (world) coordinates indexed by the
+    same slots as the OrbitEngine that owns the integrator.
+    """
+
+    workers = 0
+    asynchronous = False
+
+    def __init__(self, positions, velocities, masses, theta=DEFAULT_THETA, softening=DEFAULT_SOFTENING):
+        self.positions  = np.array(positions, dtype=np.float64).reshape(-1, 3)
+        self.velocities = np.array(velocities, dtype=np.float64).reshape(-1, 3)
+        self.masses     = np.array(masses, dtype=np.float64)
+        self.theta      = theta
+        self.softening  = softening
+        self._acc = None
+
+    @classmethod
+    def from_engine(cls, engine, **kwargs):
+        """Starts every body on its Kepler orbit around its parent at the engine's current time."""
+        n = engine.count
+        masses = derive_masses(engine)
+        unbound = unbound_satellites(engine, masses)
+        if unbound.size:
+            names = [engine.bodies[i].name for i in unbound if engine.bodies[i] is not None]
+            print(f"{unbound.size} satellites are too far out to stay with their parents under n-body physics"
+                  + (f": {', '.join(names)}" if names else ""))
+        positions = np.zeros((n, 3))
+        velocities = np.zeros((n, 3))
+        for level in range(int(engine.depth[:n].max(initial=0)) + 1):
+            for i in np.flatnonzero(engine.depth[:n] == level):
+                positions[i], velocities[i] = initial_state(engine, i, masses, positions, velocities)
+        return cls(positions, velocities, masses, **kwargs)
+
+    def step(self, dt):
+        if self._acc is None or len(self._acc) != len(self.positions):
+            self._acc = accelerations(self.positions, self.masses, self.theta, self.softening)
+        self.velocities += 0.5 * dt * self._acc
+        self.positions  += dt * self.velocities
+        self._acc = accelerations(self.positions, self.masses, self.theta, self.softening)
+        self.velocities += 0.5 * dt * self._acc
+
+    def insert(self, position, velocity, mass):
+        self.positions  = np.vstack([self.positions, position])
+        self.velocities = np.vstack([self.velocities, velocity])
+        self.masses     = np.append(self.masses, mass)
+        self._acc = None
+
+    def remove(self, i):
+        """Mirrors OrbitEngine.remove: the last slot moves into slot i."""
+        last = len(self.masses) - 1
+        for arr in (self.positions, self.velocities, self.masses):
+            arr[i] = arr[last]
+        self.positions  = self.positions[:last]
+        self.velocities = self.velocities[:last]
+        self.masses     = self.masses[:last]
+        self._acc = None
+
+    def state(self):
+        """
+        Copies of the current positions and velocities, and the seconds of
+        steps the engine has not counted yet; none when stepping inline.
+        """
+        return self.positions.copy(), self.velocities.copy(), 0.0
+
+    def pause(self):
+        """Stops any queued work before the engine edits slots; nothing to do when stepping inline."""
+
+    def close(self):
+        """Releases worker resources; nothing to do when stepping inline."""
+
+
+def derive_masses(engine):
+    """
+    Gravitational parameters per slot. Explicit masses from scene.json win;
+    otherwise a parent gets the median n^2 a^3 of its children (the mass that
+    makes their scene.json orbit speeds Keplerian) and a childless body a
+    negligible fraction of its parent's.
+
+    A derived mass is then raised, up to MAX_MASS_RATIO of its parent's, so
+    its children's apoapses lie within HILL_FRACTION of its Hill radius;
+    initial_state() rescales their speeds to match.
+    """
+    n = engine.count
+    masses = engine.mass[:n].copy()
+    derived = masses <= 0
+    n_rad = np.radians(engine.orbit_speed[:n])
+    implied = n_rad ** 2 * engine.orbit_radius[:n] ** 3
+    parent = engine.parent[:n]
+    order = np.argsort(engine.depth[:n], kind="stable")
+    for i in order:
+        if masses[i] > 0:
+            continue
+        kids = np.flatnonzero((parent == i) & (implied > 0))
+        if kids.size:
+            masses[i] = np.median(implied[kids])
+    apoapsis, periapsis = _apsides(engine)
+    for i in order:
+        p = parent[i]
+        kids = np.flatnonzero(parent == i)
+        if not derived[i] or p < 0 or not kids.size or periapsis[i] <= 0:
+            continue
+        needed = 3 * masses[p] * (apoapsis[kids].max() / (HILL_FRACTION * periapsis[i])) ** 3
+        masses[i] = max(masses[i], min(needed, MAX_MASS_RATIO * masses[p]))
+    for i in order:
+        if masses[i] <= 0:
+            masses[i] = masses[parent[i]] * LEAF_MASS_RATIO if parent[i] >= 0 else 1.0
+    return masses
+
+
+def _apsides(engine):
+    n = engine.count
+    radius, eccentricity = engine.orbit_radius[:n], engine.eccentricity[:n]
+    return radius * (1 + eccentricity), radius * (1 - eccentricity)
+
+
+def _hill_radii(engine, masses):
+    """Each slot's Hill radius a (m / 3M)^(1/3) at its periapsis; infinite for roots."""
+    parent = engine.parent[:engine.count]
+    _, periapsis = _apsides(engine)
+    radii = np.full(len(parent), np.inf)
+    has_parent = parent >= 0
+    radii[has_parent] = periapsis[has_parent] * np.cbrt(masses[has_parent] / (3 * masses[parent[has_parent]]))
+    return radii
+
+
+def unbound_satellites(engine, masses):
+    """
+    Slots that n-body physics cannot be expected to keep around their
+    parent: ones reaching past HILL_FRACTION of its Hill radius, and every
+    satellite of two siblings whose orbits bring their Hill spheres together.
+    Childless bodies weigh next to nothing and are not counted as crowding.
+    """
+    n = engine.count
+    parent = engine.parent[:n]
+    apoapsis, periapsis = _apsides(engine)
+    radii = _hill_radii(engine, masses)
+    loose = np.zeros(n, dtype=bool)
+    has_parent = parent >= 0
+    loose[has_parent] = apoapsis[has_parent] > HILL_FRACTION * radii[parent[has_parent]]
+    crowded = np.zeros(n, dtype=bool)
+    parents = np.unique(parent[has_parent])
+    for p in parents:
+        siblings = np.intersect1d(np.flatnonzero(parent == p), parents)
+        for k, i in enumerate(siblings):
+            for j in siblings[k + 1:]:
+                gap = max(periapsis[j] - apoapsis[i], periapsis[i] - apoapsis[j])
+                if gap < radii[i] + radii[j]:
+                    crowded[[i, j]] = True
+    loose[has_parent] |= crowded[parent[has_parent]]
+    return np.flatnonzero(loose)
+
+
+def initial_state(engine, i, masses, positions, velocities, h=1e-4):
+    """
+    World position and velocity for slot i on its scene.json ellipse around
+    its (already initialised) parent. The speed is rescaled with vis-viva so
+    the orbit keeps its shape under the parent's actual mass.
+    """
+    p = engine.parent[i]
+    t = engine.time
+    rel_pos = engine.position_of(i, t)
+    if p < 0:
+        return rel_pos, np.zeros(3)
+    rel_vel = (engine.position_of(i, t + h) - engine.position_of(i, t - h)) / (2 * h)
+    implied = np.radians(engine.orbit_speed[i]) ** 2 * engine.orbit_radius[i] ** 3
+    if implied > 0:
+        rel_vel *= np.sqrt(masses[p] / implied)
+    return positions[p] + rel_pos, velocities[p] + rel_vel
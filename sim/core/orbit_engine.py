@@ -0,0 +1,351 @@
+import math
+
+import numpy as np
+
+from core.nbody import NBodyIntegrator, derive_masses, initial_state
+from core.parallel import ParallelNBodyIntegrator
+from utils.orbit_math import kepler_positions
+
+
+class OrbitEngine:
+    """
+    Stores the orbital elements of every body in contiguous arrays and
+    advances all of them in one batched step.
+
+    Angles are stored as phases at time 0, so the state at any absolute time
+    is evaluated in O(1): the mean anomaly is phase + speed * time and the
+    position comes from solving Kepler's equation, which lets callers jump
+    or scrub through time without integrating.
+
+    The engine does not need Panda3D: slots registered without a
+    CelestialBody (e.g. by the headless Simulation) simply have no node to
+    write to in sync().
+
+    With the "nbody" physics backend the ellipses only seed an
+    NBodyIntegrator, which then owns the positions of the current time.
+    With workers > 1 its force evaluation runs in a process pool and the
+    renderer can queue steps through step_async() without waiting for them.
+    """
+
+    _FIELDS = (
+        "orbit_radius", "semi_minor", "eccentricity", "inclination",
+        "orbit_speed", "rotation_speed", "overlay_speed",
+        "orbit_phase", "rotation_phase", "overlay_phase", "mass",
+    )
+    _INT_FIELDS = ("parent", "depth")
+
+    def __init__(self, capacity=64):
+        self.time = 0.0
+        self.count = 0
+        self.integrator = None
+        self.bodies = []
+        self._capacity = 0
+        self._positions = np.empty((0, 3))
+        self._resize(capacity)
+
+    def _resize(self, capacity):
+        for field in self._FIELDS + self._INT_FIELDS:
+            old = getattr(self, field, None)
+            arr = np.zeros(capacity, dtype=np.int64 if field in self._INT_FIELDS else np.float64)
+            if old is not None:
+                arr[:self.count] = old[:self.count]
+            setattr(self, field, arr)
+        self._positions = np.empty((capacity, 3))
+        self._capacity = capacity
+
+    def add_orbit(
+        self,
+        orbit_radius=0.0,
+        eccentricity=0.0,
+        inclination=0.0,
+        orbit_speed=0.0,
+        rotation_speed=0.0,
+        overlay_speed=0.0,
+        orbit_angle=0.0,
+        rotation_angle=0.0,
+        overlay_angle=0.0,
+        parent=-1,
+        body=None,
+        mass=0.0,
+    ):
+        """
+        Appends one orbit and returns its slot. Angles are the current ones (the
+        orbit angle being the mean anomaly); parent is the parent's slot or -1.
+        """
+        if self.count == self._capacity:
+            self._resize(self._capacity * 2)
+        if self.integrator is not None:
+            positions, velocities = self.nbody_state()
+        i = self.count
+        self.orbit_radius[i]   = orbit_radius
+        self.semi_minor[i]     = orbit_radius * math.sqrt(max(0, 1 - eccentricity**2))
+        self.eccentricity[i]   = eccentricity
+        self.inclination[i]    = inclination
+        self.orbit_speed[i]    = orbit_speed
+        self.rotation_speed[i] = rotation_speed
+        self.overlay_speed[i]  = overlay_speed
+        self.orbit_phase[i]    = orbit_angle - orbit_speed * self.time
+        self.rotation_phase[i] = rotation_angle - rotation_speed * self.time
+        self.overlay_phase[i]  = overlay_angle - overlay_speed * self.time
+        self.parent[i]         = parent
+        self.depth[i]          = self.depth[parent] + 1 if parent >= 0 else 0
+        self.mass[i]           = mass or 0.0
+        self.bodies.append(body)
+        self.count += 1
+        if self.integrator is not None:
+            masses = derive_masses(self)
+            pos, vel = initial_state(self, i, masses, positions, velocities)
+            self.integrator.insert(pos, vel, masses[i])
+        return i
+
+    def extend(self, parent, orbit_radius, eccentricity, inclination, orbit_speed,
+               rotation_speed, overlay_speed, mass):
+        """
+        Appends one orbit per element of the equal-length arrays, every angle
+        being zero now, and returns the first new slot. parent holds slots and
+        every parent must come before its children, as in pre-order.
+        """
+        if self.integrator is not None:
+            raise ValueError("extend() must run before n-body physics is enabled")
+        first, k = self.count, len(parent)
+        capacity = self._capacity
+        while capacity < first + k:
+            capacity *= 2
+        if capacity != self._capacity:
+            self._resize(capacity)
+        s = slice(first, first + k)
+        eccentricity = np.asarray(eccentricity, dtype=np.float64)
+        self.orbit_radius[s]   = orbit_radius
+        self.semi_minor[s]     = self.orbit_radius[s] * np.sqrt(np.maximum(0, 1 - eccentricity ** 2))
+        self.eccentricity[s]   = eccentricity
+        self.inclination[s]    = inclination
+        self.orbit_speed[s]    = orbit_speed
+        self.rotation_speed[s] = rotation_speed
+        self.overlay_speed[s]  = overlay_speed
+        self.orbit_phase[s]    = -self.orbit_speed[s] * self.time
+        self.rotation_phase[s] = -self.rotation_speed[s] * self.time
+        self.overlay_phase[s]  = -self.overlay_speed[s] * self.time
+        self.mass[s]           = np.nan_to_num(mass, nan=0.0)
+        self.parent[s]         = parent
+
+        # Hop up through the new rows until every chain leaves the batch.
+        parent = np.asarray(parent, dtype=np.int64)
+        depth, hop = np.ones(k, dtype=np.int64), parent.copy()
+        inside = hop >= first
+        while inside.any():
+            depth[inside] += 1
+            hop[inside] = parent[hop[inside] - first]
+            inside = hop >= first
+        self.depth[s] = np.where(hop >= 0, self.depth[np.maximum(hop, 0)] + depth, depth - 1)
+
+        self.bodies.extend([None] * k)
+        self.count += k
+        return first
+
+    def unregister(self, body):
+        self.remove(body._orbit_index)
+        body._orbit_index = None
+
+    def remove(self, i):
+        """Removes slot i by moving the last slot into its place."""
+        last = self.count - 1
+        if i != last:
+            for field in self._FIELDS + self._INT_FIELDS:
+                arr = getattr(self, field)
+                arr[i] = arr[last]
+            self.parent[:last][self.parent[:last] == last] = i
+            moved = self.bodies[last]
+            if moved is not None:
+                moved._orbit_index = i
+            self.bodies[i] = moved
+        self.bodies.pop()
+        self.count = last
+        if self.integrator is not None:
+            self.integrator.remove(i)
+
+    def reparent(self, i, parent):
+        self.parent[i] = parent
+        self.depth[i] = self.depth[parent] + 1 if parent >= 0 else 0
+
+    def clear(self):
+        for body in self.bodies:
+            if body is not None:
+                body._orbit_index = None
+        self.bodies = []
+        self.count = 0
+        self.close()
+
+    def close(self):
+        """Stops the n-body integrator and its workers, if any."""
+        if self.integrator is not None:
+            self.integrator.close()
+            self.integrator = None
+
+    def set_physics(self, physics, workers=0):
+        """
+        Selects "kepler" (analytic ellipses) or "nbody" (mutual gravity)
+        propagation. For n-body, workers > 1 spreads the force evaluation over
+        that many processes; switching keeps the current n-body state.
+        """
+        if physics == "nbody":
+            cls = ParallelNBodyIntegrator if workers > 1 else NBodyIntegrator
+            kwargs = {"workers": workers} if workers > 1 else {}
+            old = self.integrator
+            if old is None:
+                self.integrator = cls.from_engine(self, **kwargs)
+            elif old.workers != (workers if workers > 1 else 0):
+                positions, velocities = self.nbody_state()
+                self.integrator = cls(positions, velocities, old.masses,
+                                      theta=old.theta, softening=old.softening, **kwargs)
+                old.close()
+        elif physics == "kepler":
+            self.close()
+        else:
+            raise ValueError(f"Unknown physics backend: {physics!r}")
+
+    def set_nbody_state(self, positions, velocities, t):
+        """Replaces the n-body positions and velocities, e.g. from a recording keyframe, at time t."""
+        old = self.integrator
+        old.pause()
+        kwargs = {"workers": old.workers} if old.workers else {}
+        self.integrator = type(old)(positions, velocities, old.masses,
+                                    theta=old.theta, softening=old.softening, **kwargs)
+        old.close()
+        self.time = t
+
+    def nbody_state(self):
+        """
+        Pauses the n-body integrator and returns copies of its current world
+        positions and velocities, first counting any steps it finished that
+        step_async() has not, so time and both arrays agree.
+        """
+        positions, velocities, elapsed = self.integrator.state()
+        self.time += elapsed
+        return positions, velocities
+
+    @property
+    def asynchronous(self):
+        return self.integrator is not None and self.integrator.asynchronous
+
+    def step(self, dt):
+        """Advances every orbit, axial rotation and overlay by dt seconds."""
+        if self.integrator is not None:
+            self.integrator.step(dt)
+        self.time += dt
+        return self.time
+
+    def step_async(self, dt, steps, max_pending):
+        """
+        Queues steps on a parallel integrator and advances time by the ones
+        that completed since the last call, which is what positions() shows.
+        """
+        done = self.integrator.submit(steps, dt, max_pending)
+        self.time += done * dt
+        return done
+
+    def set_time(self, t):
+        """Jumps to absolute time t; nothing is integrated."""
+        if self.integrator is not None:
+            raise ValueError("n-body physics can only be stepped, not seeked")
+        self.time = t
+
+    def orbit_angles(self, t=None):
+        """Mean anomalies in degrees at time t (default: now)."""
+        n = self.count
+        t = self.time if t is None else t
+        return np.mod(self.orbit_phase[:n] + self.orbit_speed[:n] * t, 360)
+
+    def rotation_angles(self, t=None):
+        n = self.count
+        t = self.time if t is None else t
+        return self.rotation_phase[:n] + self.rotation_speed[:n] * t
+
+    def overlay_angles(self, t=None):
+        n = self.count
+        t = self.time if t is None else t
+        return self.overlay_phase[:n] + self.overlay_speed[:n] * t
+
+    def angles_of(self, i):
+        """(orbit, rotation, overlay) angles of slot i at the current time."""
+        t = self.time
+        return (
+            (self.orbit_phase[i] + self.orbit_speed[i] * t) % 360,
+            self.rotation_phase[i] + self.rotation_speed[i] * t,
+            self.overlay_phase[i] + self.overlay_speed[i] * t,
+        )
+
+    def position_of(self, i, t=None):
+        """Kepler position of slot i relative to its parent at time t (default: now)."""
+        t = self.time if t is None else t
+        s = slice(i, i + 1)
+        mean_anomaly = np.mod(self.orbit_phase[s] + self.orbit_speed[s] * t, 360)
+        return kepler_positions(
+            self.orbit_radius[s], self.semi_minor[s], self.eccentricity[s],
+            self.inclination[s], mean_anomaly,
+        )[0]
+
+    def world_position_of(self, i, t=None):
+        """Absolute position of slot i at time t (default: now), summed up its parent chain."""
+        if self.integrator is not None:
+            self._check_current(t)
+            return self.integrator.positions[i].copy()
+        world = np.zeros(3)
+        while i >= 0:
+            world += self.position_of(i, t)
+            i = self.parent[i]
+        return world
+
+    def positions(self, t=None):
+        """(n, 3) array of positions relative to each body's parent at time t (default: now)."""
+        n = self.count
+        if self.integrator is not None:
+            self._check_current(t)
+            world = self.integrator.positions
+            local = self._positions[:n]
+            local[:] = world
+            has_parent = self.parent[:n] >= 0
+            local[has_parent] -= world[self.parent[:n][has_parent]]
+            return local
+        return kepler_positions(
+            self.orbit_radius[:n], self.semi_minor[:n], self.eccentricity[:n],
+            self.inclination[:n], self.orbit_angles(t), out=self._positions[:n],
+        )
+
+    def world_positions(self, t=None):
+        """(n, 3) array of absolute positions, accumulated one hierarchy level at a time."""
+        n = self.count
+        if self.integrator is not None:
+            self._check_current(t)
+            return self.integrator.positions.copy()
+        return self.to_world(self.positions(t))
+
+    def to_world(self, local):
+        """Absolute positions from an (n, 3) array of parent-relative ones, e.g. from positions()."""
+        world = local.copy()
+        depth = self.depth[:self.count]
+        parent = self.parent[:self.count]
+        for level in range(1, int(depth.max(initial=0)) + 1):
+            idx = np.flatnonzero(depth == level)
+            world[idx] += world[parent[idx]]
+        return world
+
+    def _check_current(self, t):
+        if t is not None and t != self.time:
+            raise ValueError("n-body positions are only known at the current time")
+
+    def sync(self, origin=None):
+        """
+        Writes the current state back to the scene graph in bulk. Body nodes
+        are flat children of one render root, so they get world positions,
+        taken relative to origin (a float64 world point) when given.
+        """
+        world = self.world_positions()
+        if origin is not None:
+            world -= origin
+        for body, (x, y, z) in zip(self.bodies, world.tolist()):
+            if body is not None:
+                body.node.setPos(x, y, z)
+        overlay_angles = self.overlay_angles().tolist()
+        for body, angle in zip(self.bodies, overlay_angles):
+            if body is not None and body.overlay_np:
+                body.overlay_np.setHpr(angle, -90, 0)
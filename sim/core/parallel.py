@@ -0,0 +1,238 @@
+import os
+import threading
+import weakref
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core.nbody import NBodyIntegrator, accelerations, DEFAULT_THETA, DEFAULT_SOFTENING
+
+
+def _attach(names, n):
+    """Maps the shared position, mass and acceleration blocks as arrays."""
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    positions = np.ndarray((n, 3), dtype=np.float64, buffer=blocks[0].buf)
+    masses    = np.ndarray((n,), dtype=np.float64, buffer=blocks[1].buf)
+    acc       = np.ndarray((n, 3), dtype=np.float64, buffer=blocks[2].buf)
+    return blocks, positions, masses, acc
+
+
+def _worker(conn, theta, softening):
+    """
+    Worker process loop. Only tiny control tuples travel through the pipe:
+    ("attach", names, n) maps new shared arrays and ("acc", start, end)
+    writes the accelerations of that slot range into the shared output.
+    """
+    blocks, positions, masses, acc = [], None, None, None
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        if msg[0] == "attach":
+            for block in blocks:
+                block.close()
+            del positions, masses, acc
+            blocks, positions, masses, acc = _attach(msg[1], msg[2])
+        elif msg[0] == "acc":
+            start, end = msg[1], msg[2]
+            acc[start:end] = accelerations(positions, masses, theta, softening, np.arange(start, end))
+        conn.send(True)
+    del positions, masses, acc
+    for block in blocks:
+        block.close()
+
+
+def _shutdown(procs, conns, blocks):
+    for conn in conns:
+        try:
+            conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+    for proc in procs:
+        proc.join(timeout=5)
+        if proc.is_alive():
+            proc.terminate()
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:
+            pass  # still mapped by arrays that outlive the integrator at exit
+        block.unlink()
+    blocks.clear()
+
+
+class ParallelNBodyIntegrator(NBodyIntegrator):
+    """
+    NBodyIntegrator whose force evaluation is split across worker processes.
+
+    Positions, masses and accelerations live in shared memory: each worker
+    walks the tree for a contiguous range of slots and writes its rows in
+    place, so nothing but (start, end) pairs is ever pickled.
+
+    step() runs one step and blocks, which suits headless batch runs. The
+    renderer uses submit() instead: steps are queued on a background thread
+    and `positions` stays on the last completed frame the caller collected,
+    so reading it never waits for the workers.
+    """
+
+    asynchronous = True
+
+    def __init__(self, positions, velocities, masses, workers=None,
+                 theta=DEFAULT_THETA, softening=DEFAULT_SOFTENING):
+        self.workers    = workers or os.cpu_count() or 1
+        self.theta      = theta
+        self.softening  = softening
+        self.velocities = np.array(velocities, dtype=np.float64).reshape(-1, 3)
+
+        ctx = mp.get_context("spawn")
+        self._blocks = []
+        self._conns = []
+        self._procs = []
+        for _ in range(self.workers):
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(target=_worker, args=(child_conn, theta, softening), daemon=True)
+            proc.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._procs.append(proc)
+        self._finalizer = weakref.finalize(self, _shutdown, self._procs, self._conns, self._blocks)
+
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pending = 0
+        self._completed = 0
+        self._running = False
+        self._closing = False
+        self._dt = 0.0
+
+        self._allocate(np.array(positions, dtype=np.float64).reshape(-1, 3),
+                       np.array(masses, dtype=np.float64))
+
+    @property
+    def positions(self):
+        """The frame to render, which may trail the velocities; state() has the current one."""
+        return self._visible
+
+    def _allocate(self, positions, masses):
+        """Moves the state into fresh shared blocks sized for len(masses) bodies."""
+        n = len(masses)
+        sizes = (n * 3 * 8, n * 8, n * 3 * 8)
+        blocks = [shared_memory.SharedMemory(create=True, size=max(size, 8)) for size in sizes]
+        old = list(self._blocks)
+        self._blocks[:] = blocks
+
+        self._pos    = np.ndarray((n, 3), dtype=np.float64, buffer=blocks[0].buf)
+        self.masses  = np.ndarray((n,), dtype=np.float64, buffer=blocks[1].buf)
+        self._shared_acc = np.ndarray((n, 3), dtype=np.float64, buffer=blocks[2].buf)
+        self._pos[:] = positions
+        self.masses[:] = masses
+        self._acc_valid = False
+        self._frame = self._visible = self._pos.copy()
+
+        self._broadcast([("attach", [b.name for b in blocks], n)] * self.workers)
+        for block in old:
+            block.close()
+            block.unlink()
+
+    def _broadcast(self, messages):
+        for conn, msg in zip(self._conns, messages):
+            conn.send(msg)
+        for conn in self._conns:
+            conn.recv()
+
+    def _accelerations(self):
+        bounds = np.linspace(0, len(self.masses), self.workers + 1).astype(int)
+        self._broadcast([("acc", int(s), int(e)) for s, e in zip(bounds[:-1], bounds[1:])])
+        self._acc_valid = True
+        return self._shared_acc
+
+    def _step(self, dt):
+        """One kick-drift-kick step on the shared arrays, published as a new frame."""
+        acc = self._shared_acc if self._acc_valid else self._accelerations()
+        self.velocities += 0.5 * dt * acc
+        self._pos += dt * self.velocities
+        acc = self._accelerations()
+        self.velocities += 0.5 * dt * acc
+        return self._pos.copy()
+
+    def step(self, dt):
+        self.pause()
+        self._frame = self._visible = self._step(dt)
+
+    def submit(self, steps, dt, max_pending):
+        """
+        Queues steps for the background thread without waiting and returns
+        how many finished since the previous call; `positions` then shows
+        the frame reached after exactly those steps.
+        """
+        with self._cond:
+            self._pending = min(self._pending + steps, max_pending)
+            self._dt = dt
+            done, self._completed = self._completed, 0
+            self._visible = self._frame
+            self._cond.notify_all()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="nbody-stepper", daemon=True)
+            self._thread.start()
+        return done
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if self._closing:
+                    return
+                dt = self._dt
+                self._running = True
+            frame = self._step(dt)
+            with self._cond:
+                self._pending = max(self._pending - 1, 0)
+                self._completed += 1
+                self._frame = frame
+                self._running = False
+                self._cond.notify_all()
+
+    def pause(self):
+        """Drops queued steps and waits for the one in flight, if any."""
+        with self._cond:
+            self._pending = 0
+            while self._running:
+                self._cond.wait()
+
+    def state(self):
+        """
+        Pauses stepping and returns copies of the current positions and
+        velocities, and the seconds of steps finished since the last
+        submit(), which `positions` then shows too.
+        """
+        self.pause()
+        with self._cond:
+            elapsed, self._completed = self._completed * self._dt, 0
+            self._visible = self._frame
+        return self._pos.copy(), self.velocities.copy(), elapsed
+
+    def insert(self, position, velocity, mass):
+        self.pause()
+        self.velocities = np.vstack([self.velocities, velocity])
+        self._allocate(np.vstack([self._pos, position]), np.append(self.masses, mass))
+
+    def remove(self, i):
+        """Mirrors OrbitEngine.remove: the last slot moves into slot i."""
+        self.pause()
+        last = len(self.masses) - 1
+        positions, masses = self._pos.copy(), self.masses.copy()
+        for arr in (positions, self.velocities, masses):
+            arr[i] = arr[last]
+        self.velocities = self.velocities[:last]
+        self._allocate(positions[:last], masses[:last])
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        del self._pos, self.masses, self._shared_acc
+        self._finalizer()
@@ -0,0 +1,161 @@
+import numpy as np
+
+LEAF_SIZE     = 4
+REBUILD_EVERY = 240
+
+
+class PickingIndex:
+    """
+    Bounding volume hierarchy over the bounding spheres of every pickable
+    body, answering ray queries in O(log n) instead of traversing the scene.
+
+    The tree is stored as flat arrays. When the OrbitEngine moves bodies it
+    is only refit (boxes recomputed bottom-up, topology kept), which is a
+    handful of vectorised passes; it is rebuilt when bodies are added or
+    removed, or every REBUILD_EVERY refits as the topology goes stale.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._dirty = True
+        self._time = None
+        self._count = None
+        self._refits = 0
+
+    def invalidate(self):
+        """Forces a rebuild before the next query, e.g. after the scene changed."""
+        self._dirty = True
+
+    def refresh(self):
+        """Brings the boxes up to date with the engine's current time."""
+        engine = self.engine
+        if self._dirty or self._count != engine.count or self._refits >= REBUILD_EVERY:
+            self._rebuild()
+        elif self._time != engine.time:
+            self._refit()
+        self._time = engine.time
+
+    def _rebuild(self):
+        radius = self.engine.radius[:self.engine.count]
+        self.slots = np.flatnonzero(radius > 0)
+        self.radii = radius[self.slots].copy()
+        centers = self.engine.world_positions()[self.slots] if len(self.slots) else np.zeros((0, 3))
+
+        n = len(self.slots)
+        self.order = np.arange(n)
+        lo, hi, left, right, starts, ends, depth = [], [], [], [], [], [], []
+
+        def new_node(start, end, d):
+            lo.append(None); hi.append(None); left.append(-1); right.append(-1)
+            starts.append(start); ends.append(end); depth.append(d)
+            return len(lo) - 1
+
+        stack = [new_node(0, n, 0)] if n else []
+        while stack:
+            node = stack.pop()
+            start, end = starts[node], ends[node]
+            if end - start <= LEAF_SIZE:
+                continue
+            idx = self.order[start:end]
+            pts = centers[idx]
+            axis = int(np.argmax(pts.max(axis=0) - pts.min(axis=0)))
+            mid = (end - start) // 2
+            split = np.argpartition(pts[:, axis], mid)
+            self.order[start:end] = idx[split]
+            left[node]  = new_node(start, start + mid, depth[node] + 1)
+            right[node] = new_node(start + mid, end, depth[node] + 1)
+            stack.extend((left[node], right[node]))
+
+        self.left   = np.array(left, dtype=np.int64)
+        self.right  = np.array(right, dtype=np.int64)
+        self.start  = np.array(starts, dtype=np.int64)
+        self.end    = np.array(ends, dtype=np.int64)
+        self.lo     = np.zeros((len(lo), 3))
+        self.hi     = np.zeros((len(hi), 3))
+        depth = np.array(depth, dtype=np.int64)
+        leaves = np.flatnonzero(self.left < 0)
+        # Sorted by start so reduceat sees each leaf's contiguous range in order.
+        self._leaves = leaves[np.argsort(self.start[leaves])]
+        self._levels = [np.flatnonzero((depth == d) & (self.left >= 0))
+                        for d in range(int(depth.max(initial=0)), -1, -1)]
+        self._fit(centers)
+        self._dirty = False
+        self._count = self.engine.count
+        self._refits = 0
+
+    def _refit(self):
+        self._fit(self.engine.world_positions()[self.slots])
+        self._refits += 1
+
+    def _fit(self, centers):
+        """Recomputes every box: leaves from their spheres, then each level from its children."""
+        self.centers = centers
+        if not len(self.lo):
+            return
+        ordered = self.order
+        r = self.radii[ordered][:, None]
+        lo_pts = centers[ordered] - r
+        hi_pts = centers[ordered] + r
+        leaf_starts = self.start[self._leaves]
+        self.lo[self._leaves] = np.minimum.reduceat(lo_pts, leaf_starts)
+        self.hi[self._leaves] = np.maximum.reduceat(hi_pts, leaf_starts)
+        for nodes in self._levels:
+            self.lo[nodes] = np.minimum(self.lo[self.left[nodes]], self.lo[self.right[nodes]])
+            self.hi[nodes] = np.maximum(self.hi[self.left[nodes]], self.hi[self.right[nodes]])
+
+    def pick(self, origin, direction):
+        """
+        Returns (slot, distance) of the nearest body hit by the ray, or None.
+        origin is a world position and direction need not be unit length.
+
+        The tree is walked one level at a time, testing every box the ray
+        still crosses in one vectorised slab test, so a query costs one numpy
+        pass per level rather than one per node.
+        """
+        self.refresh()
+        if not len(self.lo):
+            return None
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        direction = direction / np.linalg.norm(direction)
+        with np.errstate(divide="ignore"):
+            inv = 1.0 / direction
+
+        frontier = np.zeros(1, dtype=np.int64)
+        leaves = []
+        while frontier.size:
+            frontier = frontier[self._hit_boxes(origin, inv, frontier)]
+            is_leaf = self.left[frontier] < 0
+            leaves.append(frontier[is_leaf])
+            inner = frontier[~is_leaf]
+            frontier = np.concatenate((self.left[inner], self.right[inner]))
+
+        leaves = np.concatenate(leaves)
+        if not leaves.size:
+            return None
+        starts, counts = self.start[leaves], self.end[leaves] - self.start[leaves]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        members = self.order[np.repeat(starts, counts) + offsets]
+        t, k = self._hit_spheres(origin, direction, members)
+        return (int(self.slots[members[k]]), float(t)) if np.isfinite(t) else None
+
+    def _hit_boxes(self, origin, inv, nodes):
+        """Mask of the nodes whose boxes the ray enters at a non-negative distance."""
+        with np.errstate(invalid="ignore"):
+            t1 = (self.lo[nodes] - origin) * inv
+            t2 = (self.hi[nodes] - origin) * inv
+        t_near = np.nanmax(np.minimum(t1, t2), axis=1)
+        t_far  = np.nanmin(np.maximum(t1, t2), axis=1)
+        return t_far >= np.maximum(t_near, 0.0)
+
+    def _hit_spheres(self, origin, direction, members):
+        """Nearest non-negative hit distance among members and its position in members."""
+        oc = self.centers[members] - origin
+        along = oc @ direction
+        miss2 = np.einsum('ij,ij->i', oc, oc) - along ** 2
+        r2 = self.radii[members] ** 2
+        half_chord = np.sqrt(np.maximum(r2 - miss2, 0.0))
+        t = np.where(along - half_chord >= 0, along - half_chord, along + half_chord)
+        t = np.where((miss2 <= r2) & (t >= 0), t, np.inf)
+        k = int(np.argmin(t))
+        return t[k], k
@@ -0,0 +1,187 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+from panda3d.core import ClockObject, ConfigVariableBool, ConfigVariableInt, TextNode
+
+globalClock = ClockObject.getGlobalClock()
+
+profiler_overlay = ConfigVariableBool(
+    'sim-profiler-overlay', False,
+    'Show the frame-time profiler overlay at startup (toggle with F3).'
+)
+profiler_window = ConfigVariableInt(
+    'sim-profiler-window', 240,
+    'Number of recent samples the overlay percentiles are computed over.'
+)
+
+# Panda3D renders the frame (cull, draw and flip) inside this task.
+RENDER_TASK   = "igLoop"
+FRAME_SERIES  = "frame"
+OVERLAY_LINES = 10
+TRACE_DIR     = "profiles"
+MAX_TRACE_EVENTS = 500_000
+
+
+class Profiler:
+    """
+    Collects per-frame timings of every task in the task manager plus named
+    spans (scene builds, texture loads) from any thread.
+
+    Each series keeps its last `window` samples for the rolling percentiles
+    shown in the overlay, and every sample is also appended to a trace that
+    dump_trace() writes in Chrome's trace event format (chrome://tracing or
+    https://ui.perfetto.dev). Task samples come from AsyncTask.getDt(), so
+    within a frame they are laid out back to back in the order they ran.
+    """
+
+    def __init__(self, window=None):
+        self.window = window or profiler_window.getValue()
+        self.enabled = True
+        self._series = {}
+        self._trace = deque(maxlen=MAX_TRACE_EVENTS)
+        self._lock = threading.Lock()
+        self._epoch = time.perf_counter()
+        self._frame_start = self._epoch
+        self._main_thread = threading.get_ident()
+        self.app = None
+        self.overlay = None
+
+    def attach(self, app):
+        """Starts sampling app's tasks every frame and sets up the overlay keys."""
+        from direct.gui.OnscreenText import OnscreenText
+
+        self.app = app
+        self.overlay = OnscreenText(
+            text="",
+            pos=(-1.29, -0.45),
+            scale=0.04,
+            fg=(0.7, 1, 0.7, 1),
+            align=TextNode.ALeft,
+            mayChange=True,
+        )
+        if not profiler_overlay.getValue():
+            self.overlay.hide()
+        app.accept("f3", self.toggle_overlay)
+        app.accept("f4", self.dump_trace)
+        # Runs after igLoop (sort 50) so the frame it samples is complete.
+        app.taskMgr.add(self._sample_task, "profiler", sort=60)
+        app.taskMgr.doMethodLater(0.5, self._overlay_task, "profiler_overlay")
+
+    def toggle_overlay(self):
+        if self.overlay.isHidden():
+            self.overlay.show()
+        else:
+            self.overlay.hide()
+
+    def record(self, name, duration, start=None):
+        """Adds one sample of duration seconds; start is a time.perf_counter() value."""
+        if not self.enabled:
+            return
+        if start is None:
+            start = time.perf_counter() - duration
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = [np.full(self.window, np.nan), 0]
+            series[0][series[1] % self.window] = duration
+            series[1] += 1
+            self._trace.append((name, start, duration, threading.get_ident()))
+
+    @contextmanager
+    def span(self, name):
+        """Times the body of a with-block as one sample of name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, start)
+
+    def timed(self, name):
+        """Decorator recording every call of the function as one sample of name."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def percentiles(self, name, q=(50, 95, 99)):
+        """Rolling percentiles of a series in seconds, or None if it has no samples."""
+        with self._lock:
+            series = self._series.get(name)
+            samples = series[0].copy() if series else None
+        if samples is None or np.isnan(samples).all():
+            return None
+        return np.nanpercentile(samples, q)
+
+    def _sample_task(self, task):
+        now = time.perf_counter()
+        cursor = self._frame_start
+        for t in self.app.taskMgr.mgr.getActiveTasks():
+            name = t.getName()
+            if name in ("profiler", "profiler_overlay"):
+                continue
+            dt = t.getDt()
+            self.record(name, dt, cursor)
+            cursor += dt
+        self.record(FRAME_SERIES, globalClock.getDt(), self._frame_start)
+        self._frame_start = now
+        return task.cont
+
+    def _overlay_task(self, task):
+        if not self.overlay.isHidden():
+            self.overlay.setText(self.format_overlay())
+        return task.again
+
+    def format_overlay(self):
+        rows = []
+        for name in list(self._series):
+            p = self.percentiles(name)
+            if p is not None:
+                rows.append((name, p * 1000))
+        head = [r for r in rows if r[0] in (FRAME_SERIES, RENDER_TASK)]
+        rest = sorted((r for r in rows if r[0] not in (FRAME_SERIES, RENDER_TASK)), key=lambda r: -r[1][1])
+        lines = [f"{'ms':<18} {'p50':>7} {'p95':>7} {'p99':>7}"]
+        for name, (p50, p95, p99) in (head + rest)[:OVERLAY_LINES]:
+            label = "cull+draw" if name == RENDER_TASK else name
+            lines.append(f"{label[:18]:<18} {p50:7.2f} {p95:7.2f} {p99:7.2f}")
+        return "\n".join(lines)
+
+    def dump_trace(self, path=None):
+        """Writes every recorded sample as Chrome trace JSON and returns the path."""
+        if path is None:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            path = os.path.join(TRACE_DIR, time.strftime("trace-%Y%m%d-%H%M%S.json"))
+        with self._lock:
+            samples = list(self._trace)
+        pid = os.getpid()
+        threads = {tid: ("main" if tid == self._main_thread else f"worker-{tid}") for *_, tid in samples}
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        events += [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._epoch) * 1e6,
+                "dur": duration * 1e6,
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, start, duration, tid in samples
+        ]
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"Wrote {len(events)} trace events to {path}")
+        return path
+
+
+profiler = Profiler()
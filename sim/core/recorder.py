@@ -0,0 +1,268 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+from panda3d.core import ConfigVariableDouble
+
+from core.orbit_engine import OrbitEngine
+
+record_interval = ConfigVariableDouble(
+    'sim-record-interval', 1.0 / 30.0,
+    'Simulated seconds between frames written by the trajectory recorder.'
+)
+
+RECORDING_VERSION = 1
+RECORDING_DIR     = "recordings"
+META_NAME         = "meta.json"
+CHUNK_FRAMES      = 512
+OPEN_CHUNKS       = 8
+
+# Per-frame columns: (name, dtype, trailing shape given the body count).
+COLUMNS = (
+    ("time",     np.float64, lambda n: ()),
+    ("position", np.float32, lambda n: (n, 3)),
+    ("rotation", np.float32, lambda n: (n,)),
+    ("overlay",  np.float32, lambda n: (n,)),
+)
+
+
+def _chunk_file(directory, segment, chunk, column):
+    return os.path.join(directory, f"seg{segment:03d}-chunk{chunk:05d}-{column}.npy")
+
+
+def _keyframe_file(directory, frame):
+    return os.path.join(directory, f"keyframe-{frame:08d}.npz")
+
+
+class Recorder:
+    """
+    Streams the engine's state into a recording directory.
+
+    Frames lie on a fixed grid of simulated time, start_time + k * interval,
+    so a replay finds any frame by arithmetic. Each column is kept in
+    chunks of chunk_frames frames, one memory-mapped .npy per column, and
+    every keyframe_every frames the full engine state is saved as well, so
+    a run can be resumed from a recorded moment. A change to the set of
+    bodies starts a new segment with its own paths and chunks.
+    """
+
+    def __init__(self, directory, engine, paths, interval=None, chunk_frames=CHUNK_FRAMES, keyframe_every=None):
+        self.directory = directory
+        self.engine = engine
+        self.paths = paths
+        self.interval = interval or record_interval.getValue()
+        self.chunk_frames = chunk_frames
+        self.keyframe_every = keyframe_every or chunk_frames
+        os.makedirs(directory, exist_ok=True)
+
+        self.start_time = engine.time
+        self.frames = 0
+        self.segments = []
+        self.keyframes = []
+        self._chunk = None
+        self._chunk_index = -1
+        self.new_segment()
+
+    @property
+    def next_time(self):
+        return self.start_time + self.frames * self.interval
+
+    def new_segment(self):
+        """Starts a new segment for the engine's current bodies, e.g. after a scene reload."""
+        self._close_chunk()
+        if self.segments and self.segments[-1]["frames"] == 0:
+            self.segments.pop()
+        n = self.engine.count
+        self.segments.append({
+            "first_frame": self.frames,
+            "frames": 0,
+            "paths": list(self.paths()),
+            "parent": self.engine.parent[:n].tolist(),
+        })
+        self._chunk_index = -1
+
+    def capture(self):
+        """Writes every grid frame up to the engine's current time."""
+        engine = self.engine
+        if engine.count != len(self.segments[-1]["paths"]):
+            self.new_segment()
+        while self.next_time <= engine.time + 1e-9:
+            # Kepler states are exact at any time; n-body ones only exist for now.
+            t = self.next_time if engine.integrator is None else engine.time
+            self._write(t)
+
+    def _write(self, t):
+        segment = self.segments[-1]
+        row = segment["frames"] % self.chunk_frames
+        if row == 0:
+            self._open_chunk(segment["frames"] // self.chunk_frames)
+        if self.frames % self.keyframe_every == 0 or segment["frames"] == 0:
+            self._write_keyframe()
+
+        engine = self.engine
+        self._chunk["time"][row] = self.next_time
+        self._chunk["position"][row] = engine.world_positions(t if engine.integrator is None else None)
+        self._chunk["rotation"][row] = engine.rotation_angles(t)
+        self._chunk["overlay"][row] = engine.overlay_angles(t)
+        segment["frames"] += 1
+        self.frames += 1
+        if row == self.chunk_frames - 1:
+            self._close_chunk()
+            self._write_meta()
+
+    def _open_chunk(self, chunk):
+        n = len(self.segments[-1]["paths"])
+        segment = len(self.segments) - 1
+        self._chunk = {
+            name: np.lib.format.open_memmap(
+                _chunk_file(self.directory, segment, chunk, name), mode='w+',
+                dtype=dtype, shape=(self.chunk_frames,) + shape(n),
+            )
+            for name, dtype, shape in COLUMNS
+        }
+        self._chunk_index = chunk
+
+    def _close_chunk(self):
+        if self._chunk is not None:
+            for arr in self._chunk.values():
+                arr.flush()
+            self._chunk = None
+
+    def _write_keyframe(self):
+        engine = self.engine
+        n = engine.count
+        state = {field: getattr(engine, field)[:n] for field in engine._FIELDS + engine._INT_FIELDS}
+        if engine.integrator is not None:
+            state["nbody_positions"], state["nbody_velocities"] = engine.nbody_state()
+        np.savez(_keyframe_file(self.directory, self.frames), time=self.next_time,
+                 engine_time=engine.time, **state)
+        self.keyframes.append(self.frames)
+
+    def _write_meta(self):
+        meta = {
+            "version": RECORDING_VERSION,
+            "interval": self.interval,
+            "start_time": self.start_time,
+            "chunk_frames": self.chunk_frames,
+            "frames": self.frames,
+            "segments": self.segments,
+            "keyframes": self.keyframes,
+        }
+        path = os.path.join(self.directory, META_NAME)
+        with open(path + ".tmp", 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        self._close_chunk()
+        if self.segments and self.segments[-1]["frames"] == 0:
+            self.segments.pop()
+        self._write_meta()
+        print(f"Recorded {self.frames} frames ({self.frames * self.interval:.1f} simulated s) to {self.directory}")
+
+
+def new_recording_dir(root=RECORDING_DIR):
+    return os.path.join(root, time.strftime("run-%Y%m%d-%H%M%S"))
+
+
+class Replay:
+    """
+    Read-only view of a recording. state(t) is O(1): the frame index comes
+    from t by arithmetic and only the chunk holding it is mapped, so the
+    playhead can jump or scrub in either direction at any speed.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_NAME)) as f:
+            meta = json.load(f)
+        if meta.get("version") != RECORDING_VERSION:
+            raise ValueError(f"{directory} has recording version {meta.get('version')}, expected {RECORDING_VERSION}")
+        if not meta["frames"]:
+            raise ValueError(f"{directory} has no frames")
+        self.interval = meta["interval"]
+        self.start_time = meta["start_time"]
+        self.chunk_frames = meta["chunk_frames"]
+        self.frames = meta["frames"]
+        self.segments = meta["segments"]
+        self.keyframes = meta["keyframes"]
+        self._first_frames = [s["first_frame"] for s in self.segments]
+        self._chunks = OrderedDict()
+        self.playhead = self.start_time
+        self.speed = 1.0
+
+    @property
+    def end_time(self):
+        return self.start_time + max(self.frames - 1, 0) * self.interval
+
+    def frame_at(self, t):
+        k = int(round((t - self.start_time) / self.interval))
+        return min(max(k, 0), self.frames - 1)
+
+    def segment_of(self, frame):
+        # Segments only change on scene reloads, so this list stays tiny.
+        s = len(self._first_frames) - 1
+        while self._first_frames[s] > frame:
+            s -= 1
+        return s
+
+    def _chunk(self, segment, chunk):
+        key = (segment, chunk)
+        data = self._chunks.get(key)
+        if data is None:
+            data = {name: np.load(_chunk_file(self.directory, segment, chunk, name), mmap_mode='r')
+                    for name, _, _ in COLUMNS}
+            self._chunks[key] = data
+            if len(self._chunks) > OPEN_CHUNKS:
+                self._chunks.popitem(last=False)
+        else:
+            self._chunks.move_to_end(key)
+        return data
+
+    def state(self, t):
+        """(segment, time, world positions, rotation angles, overlay angles) of the frame nearest t."""
+        frame = self.frame_at(t)
+        s = self.segment_of(frame)
+        local = frame - self.segments[s]["first_frame"]
+        data = self._chunk(s, local // self.chunk_frames)
+        row = local % self.chunk_frames
+        return s, float(data["time"][row]), data["position"][row], data["rotation"][row], data["overlay"][row]
+
+    def advance(self, dt):
+        """Moves the playhead by dt * speed seconds, clamped to the recording."""
+        self.playhead = min(max(self.playhead + dt * self.speed, self.start_time), self.end_time)
+        return self.playhead
+
+    def seek(self, t):
+        self.playhead = min(max(t, self.start_time), self.end_time)
+
+    def restore(self, engine, t, paths):
+        """
+        Loads the orbital state of the last keyframe at or before t into the
+        engine, whose bodies have the given paths in slot order, and returns
+        the time the engine resumes from: exactly t with Kepler physics, the
+        keyframe's time with n-body. Rows are matched by path, as slots move
+        when bodies are edited; the engine's own identity columns (ids,
+        kinds, sizes, parents) are left alone.
+        """
+        frame = self.frame_at(t)
+        keyframe = max((k for k in self.keyframes if k <= frame), default=None)
+        if keyframe is None:
+            raise ValueError("no keyframe before that time")
+        recorded = self.segments[self.segment_of(keyframe)]["paths"]
+        if sorted(recorded) != sorted(paths):
+            raise ValueError("the recorded bodies differ from the scene's")
+        slot = {path: k for k, path in enumerate(recorded)}
+        rows = np.array([slot[path] for path in paths], dtype=np.int64)
+        with np.load(_keyframe_file(self.directory, keyframe)) as state:
+            n = len(rows)
+            for field in OrbitEngine._FIELDS:
+                getattr(engine, field)[:n] = state[field][rows]
+            if engine.integrator is not None and "nbody_positions" in state:
+                engine.set_nbody_state(state["nbody_positions"][rows], state["nbody_velocities"][rows],
+                                       float(state["engine_time"]))
+            else:
+                engine.time = t
+        return engine.time
@@ -0,0 +1,196 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC         = b"SCNB"
+VERSION       = 1
+ALIGN         = 64
+BINARY_SUFFIX = ".scnb"
+_HEADER       = struct.Struct("<4sII")
+
+# Orbital elements stored as float64 columns; every other key of a body
+# (type, texture, rings, overlay, belt settings, ...) goes to the extras table.
+FLOAT_COLUMNS = ("orbit_radius", "eccentricity", "inclination", "orbit_speed", "rotation_speed", "radius", "mass")
+COLUMN_DEFAULTS = {"radius": 1.0, "mass": np.nan}
+
+
+def _own_extent(body, radius):
+    """How far body itself reaches from its centre; a belt reaches its outermost rock."""
+    if body.get("type") == "belt":
+        return body.get("outer_radius", 15.0) * (1 + body.get("max_eccentricity", 0.1)) + body.get("max_size", 0.08)
+    return radius
+
+
+def write_scene_file(scene_data, path):
+    """
+    Converts parsed scene.json data into the binary format. Bodies are laid
+    out in pre-order, so the subtree of body i is the contiguous range
+    [i, end[i]); the file is written next to path and moved into place, so
+    a running app never maps a half-written scene.
+    """
+    columns = {name: [] for name in FLOAT_COLUMNS}
+    parent, depth, overlay_speed = [], [], []
+    names, extras, extra_ids = [], [], {}
+    extra_index, own_extent = [], []
+
+    stack = [(scene_data, -1, 0)]
+    while stack:
+        body, parent_index, d = stack.pop()
+        for name in FLOAT_COLUMNS:
+            value = body.get(name)
+            columns[name].append(COLUMN_DEFAULTS.get(name, 0.0) if value is None else float(value))
+        overlay = body.get("overlay") or {}
+        overlay_speed.append(float(overlay.get("speed", 0.0)) if overlay.get("texture") else 0.0)
+        parent.append(parent_index)
+        depth.append(d)
+        names.append(body.get("name", "Unnamed"))
+
+        extra = {k: v for k, v in body.items() if k not in FLOAT_COLUMNS and k not in ("name", "children")}
+        key = json.dumps(extra, sort_keys=True)
+        if key not in extra_ids:
+            extra_ids[key] = len(extras)
+            extras.append(key)
+        extra_index.append(extra_ids[key])
+        own_extent.append(_own_extent(body, columns["radius"][-1]))
+
+        i = len(parent) - 1
+        stack.extend((child, i, d + 1) for child in reversed(body.get("children", [])))
+
+    n = len(parent)
+    parent = np.array(parent, dtype=np.int64)
+    end = np.arange(1, n + 1, dtype=np.int64)
+    extent = np.array(own_extent, dtype=np.float64)
+    orbit_reach = np.array(columns["orbit_radius"]) * (1 + np.array(columns["eccentricity"]))
+    # Children always follow their parent in pre-order, so one reverse pass
+    # folds every subtree's end and reach into its root.
+    for i in range(n - 1, 0, -1):
+        p = parent[i]
+        end[p] = max(end[p], end[i])
+        extent[p] = max(extent[p], orbit_reach[i] + extent[i])
+
+    arrays = {name: np.array(values, dtype=np.float64) for name, values in columns.items()}
+    arrays["overlay_speed"] = np.array(overlay_speed, dtype=np.float64)
+    arrays["extent"] = extent
+    arrays["parent"] = parent
+    arrays["end"] = end
+    arrays["depth"] = np.array(depth, dtype=np.int32)
+    arrays["extra"] = np.array(extra_index, dtype=np.int32)
+    for table, strings in (("name", names), ("extras", extras)):
+        blob = [s.encode("utf-8") for s in strings]
+        arrays[f"{table}_offsets"] = np.concatenate(([0], np.cumsum([len(b) for b in blob]))).astype(np.int64)
+        arrays[f"{table}_blob"] = np.frombuffer(b"".join(blob), dtype=np.uint8)
+
+    layout, offset = {}, 0
+    for name, arr in arrays.items():
+        layout[name] = [arr.dtype.str, offset, len(arr)]
+        offset += -(-arr.nbytes // ALIGN) * ALIGN
+    header = json.dumps({"count": n, "columns": layout}).encode("utf-8")
+    data_start = -(-(_HEADER.size + len(header)) // ALIGN) * ALIGN
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, arr in arrays.items():
+            f.seek(data_start + layout[name][1])
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return n
+
+
+class SceneFile:
+    """
+    A memory-mapped binary scene. Opening it only reads the header; the
+    columns are numpy views onto the file, so untouched bodies cost no
+    memory, and body(i) or subtree(i) decode a scene.json-shaped dict on
+    demand.
+    """
+
+    def __init__(self, path):
+        self.filename = path
+        with open(path, "rb") as f:
+            magic, version, header_len = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a binary scene file")
+            if version != VERSION:
+                raise ValueError(f"{path} has scene format version {version}, expected {VERSION}")
+            header = json.loads(f.read(header_len))
+        data_start = -(-(_HEADER.size + header_len) // ALIGN) * ALIGN
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        self.count = header["count"]
+        for name, (dtype, offset, length) in header["columns"].items():
+            start = data_start + offset
+            view = self._map[start:start + length * np.dtype(dtype).itemsize].view(dtype)
+            setattr(self, name, view)
+        self._extras = {}
+
+    def __len__(self):
+        return self.count
+
+    def _string(self, table, k):
+        offsets = getattr(self, f"{table}_offsets")
+        return bytes(getattr(self, f"{table}_blob")[offsets[k]:offsets[k + 1]]).decode("utf-8")
+
+    def name(self, i):
+        return self._string("name", i)
+
+    def paths(self):
+        """Every body's path, decoding the name table in one pass."""
+        raw, offsets = bytes(self.name_blob), self.name_offsets.tolist()
+        paths = []
+        for i, parent in enumerate(self.parent.tolist()):
+            name = raw[offsets[i]:offsets[i + 1]].decode("utf-8")
+            paths.append(f"{paths[parent] if parent >= 0 else ''}/{name}")
+        return paths
+
+    def children(self, i):
+        """Indices of the direct children of body i."""
+        out, j, end = [], i + 1, self.end[i]
+        while j < end:
+            out.append(j)
+            j = int(self.end[j])
+        return out
+
+    def path(self, i):
+        parts = []
+        while i >= 0:
+            parts.append(self.name(i))
+            i = int(self.parent[i])
+        return "/" + "/".join(reversed(parts))
+
+    def body(self, i):
+        """Body i as a scene.json dict without its children."""
+        k = int(self.extra[i])
+        extra = self._extras.get(k)
+        if extra is None:
+            extra = self._extras[k] = json.loads(self._string("extras", k))
+        data = {"name": self.name(i)}
+        for name in FLOAT_COLUMNS:
+            value = float(getattr(self, name)[i])
+            if not np.isnan(value):
+                data[name] = value
+        data.update(extra)
+        return data
+
+    def subtree(self, i=0, depth=None):
+        """Body i with its descendants down to depth levels (all by default), as scene.json data."""
+        data = self.body(i)
+        children = self.children(i)
+        if children and (depth is None or depth > 0):
+            data["children"] = [self.subtree(j, None if depth is None else depth - 1) for j in children]
+        return data
+
+    def get(self, key, default=None):
+        """Scene-level settings such as "physics" live on the root body, as in scene.json."""
+        return self.body(0).get(key, default)
+
+
+def load_scene(path):
+    """Opens a binary scene, or parses a scene.json."""
+    if path.endswith(BINARY_SUFFIX):
+        return SceneFile(path)
+    with open(path, "r") as f:
+        return json.load(f)
@@ -1,27 +1,340 @@
 from objects.celestial_body import CelestialBody
-from panda3d.core import PointLight
+from objects.asteroid_belt import AsteroidBelt
+from objects.orbit_paths import OrbitPaths
+from core.simulation import Simulation
+from core.body_registry import BodyRegistry
+from core.floating_origin import FloatingOrigin
+from core.picking import PickingIndex
+from core.profiler import profiler
+from core.recorder import Recorder, Replay, new_recording_dir
+from core.scene_file import SceneFile
+from core.texture_manager import STARFIELD_OWNER
+from core.visibility import VisibilityScheduler
+from panda3d.core import PointLight, ClockObject, ConfigVariableDouble
+import numpy as np
+
+globalClock = ClockObject.getGlobalClock()
+
+subtree_load_distance = ConfigVariableDouble(
+    'sim-subtree-load-distance', 25.0,
+    'Camera distance, in multiples of a subtree\'s extent, within which a binary scene loads its bodies.'
+)
+SUBTREE_UNLOAD_MARGIN  = 1.25
+SUBTREE_CHECK_INTERVAL = 0.25
+# Scene-wide settings kept on the root body; changing them is not an edit of that body.
+SCENE_SETTINGS         = ("physics", "workers")
+
+
+def _body_fields(body_data):
+    """A body's own scene.json entry, without its children or scene-wide settings."""
+    return {k: v for k, v in body_data.items() if k != "children" and k not in SCENE_SETTINGS}
 
 
 class SceneManager:
     def __init__(self, app):
         self.app = app
         self.root_node = app.render
+        self.simulation = Simulation(engine=BodyRegistry())
+        self.orbit_engine = self.simulation.engine
+        self.picking = PickingIndex(self.orbit_engine)
+        self.floating_origin = FloatingOrigin(app, self.orbit_engine)
+        self.visibility = VisibilityScheduler(app, self.orbit_engine, self.root_node, self.floating_origin)
+        self.orbit_paths = OrbitPaths(app, self.orbit_engine, self.floating_origin, self.root_node)
+        self.bodies = {}
+        self.belts = {}
+        self._body_data = {}
+        self.scene_file = None
+        # Bodies of a binary scene whose children are not built yet, by path,
+        # and the subset whose children are currently built.
+        self._subtrees = {}
+        self._loaded_subtrees = set()
+        self.recorder = None
+        self.replay = None
+        self.last_recording = None
+        self._replay_bodies = {}
+        app.taskMgr.add(self.update_task, "update-orbits")
+        app.taskMgr.doMethodLater(SUBTREE_CHECK_INTERVAL, self.stream_subtrees_task, "stream-subtrees")
+
+    def update_task(self, task):
+        """
+        Feeds real time into the fixed-timestep simulation and renders its
+        state. The visibility pass runs even while time is frozen, since
+        bodies skipped off-screen need writing once the camera turns to them.
+        """
+        elapsed = globalClock.getDt() * self.app._speed_factor
+        self.floating_origin.update(follow_focus=self.replay is None)
+        if self.replay is not None:
+            if not self.app._frozen_time:
+                self.replay.advance(elapsed)
+            self._show_replay_frame()
+            self.orbit_paths.update(live=False)
+            return task.cont
+        if not self.app._frozen_time:
+            if self.simulation.advance(elapsed) and self.recorder is not None:
+                self.recorder.capture()
+        self.visibility.update()
+        self.orbit_paths.update()
+        return task.cont
+
+    def start_recording(self, directory=None):
+        """Starts streaming the simulation into a new recording directory."""
+        self.recorder = Recorder(directory or new_recording_dir(), self.orbit_engine, self._body_paths)
+        print(f"Recording to {self.recorder.directory}")
+
+    def stop_recording(self):
+        self.recorder.close()
+        self.last_recording = self.recorder.directory
+        self.recorder = None
+
+    def _body_paths(self):
+        return [body.path for body in self.orbit_engine.bodies]
+
+    def start_replay(self, directory=None):
+        """
+        Shows a recording instead of the live simulation; the simulation is
+        left untouched underneath. Defaults to the last recording made.
+        """
+        if self.recorder is not None:
+            self.stop_recording()
+        directory = directory or self.last_recording
+        if directory is None:
+            print("Nothing recorded yet")
+            return
+        try:
+            self.replay = Replay(directory)
+        except ValueError as e:
+            print(f"Cannot replay {directory}: {e}")
+            return
+        self._replay_bodies = {}
+        self.visibility.release()
+        print(f"Replaying {directory} ({self.replay.end_time - self.replay.start_time:.1f} simulated s)")
+
+    def stop_replay(self, resume=False):
+        """Returns to the live simulation, optionally resuming it from the playhead."""
+        if resume:
+            try:
+                self.simulation.seek(self.replay.restore(self.orbit_engine, self.replay.playhead, self._body_paths()))
+            except ValueError as e:
+                print(f"Cannot resume from the recording: {e}")
+        self.replay = None
+        self.orbit_engine.sync(self.floating_origin.origin)
+        self.visibility.invalidate()
+
+    def _show_replay_frame(self):
+        """Writes the recorded frame under the playhead to the scene graph."""
+        segment, t, world, rotation, overlay = self.replay.state(self.replay.playhead)
+        bodies = self._replay_bodies.get(segment)
+        if bodies is None:
+            bodies = [self.bodies.get(path) for path in self.replay.segments[segment]["paths"]]
+            self._replay_bodies[segment] = bodies
 
+        render = self.floating_origin.to_render(world)
+        for body, (x, y, z), h, angle in zip(bodies, render.tolist(), rotation.tolist(), overlay.tolist()):
+            if body is not None:
+                body.node.setPos(x, y, z)
+                if body.overlay_np:
+                    body.overlay_np.setHpr(angle, -90, 0)
+                if isinstance(body, CelestialBody):
+                    body.model.setH(h)
+        for belt in self.belts.values():
+            belt.update(t)
+
+    def _scene_changed(self):
+        """Refreshes everything indexed by body after bodies were added or removed."""
+        self.picking.invalidate()
+        self.visibility.invalidate()
+        self.orbit_paths.invalidate()
+        if self.replay is None:
+            # Position new nodes now rather than showing them at the origin for a frame.
+            self.visibility.update()
+        self._release_textures()
+        self._replay_bodies = {}
+        if self.recorder is not None:
+            self.recorder.new_segment()
+
+    @profiler.timed("build_scene")
     def build_scene(self, scene_data):
         """
         Entry point: Builds the entire scene graph recursively from root node.
+        scene_data is parsed scene.json or a SceneFile; of a SceneFile only the
+        root and its children are built up front, unless physics is "nbody".
         """
-        for light_np in self.root_node.getChildren():
+        for light_np in self.floating_origin.world_np.getChildren():
             if light_np.node().isOfType(PointLight.getClassType()):
                  self.root_node.clearLight(light_np)
-                 
-        self._build_recursive(scene_data, self.root_node)
 
-    def _build_recursive(self, body_data, parent_node):
+        for path, body in self.bodies.items():
+            self.app.asset_loader.cancel(path)
+            body.node.removeNode()
+        self.orbit_engine.clear()
+        self.bodies = {}
+        self.belts = {}
+        self._body_data = {}
+        self._subtrees = {}
+        self._loaded_subtrees = set()
+        if isinstance(scene_data, SceneFile):
+            self.scene_file = scene_data
+            self._lazy = scene_data.get("physics", "kepler") != "nbody"
+            self._build_time = self.orbit_engine.time
+            self._build_from_file(0)
+        else:
+            self.scene_file = None
+            self._build_recursive(scene_data)
+        self.orbit_engine.set_physics(scene_data.get("physics", "kepler"), scene_data.get("workers", 0))
+        self._scene_changed()
+
+    @profiler.timed("update_scene")
+    def update_scene(self, scene_data):
         """
-        Recursive scene graph builder.
-        Creates a CelestialBody and attaches children if they exist.
+        Applies a new version of scene.json by diffing it against the current
+        scene by body path. Only added, removed or edited bodies are touched;
+        every other body keeps its node, task slot and orbit phase.
+        A SceneFile is rebuilt instead, as only part of it is materialized.
+        """
+        if isinstance(scene_data, SceneFile):
+            self.build_scene(scene_data)
+            return
+        new_data = self._flatten(scene_data)
+
+        removed = [path for path in self._body_data if path not in new_data]
+        for path in reversed(removed):
+            self._remove_body(path)
+
+        for path, (parent_path, data) in new_data.items():
+            if path not in self.bodies:
+                self._create_body(data, path)
+            elif data != self._body_data[path]:
+                self._replace_body(path, data)
+
+        self.orbit_engine.set_physics(scene_data.get("physics", "kepler"), scene_data.get("workers", 0))
+        self.orbit_engine.sync(self.floating_origin.origin)
+        self._scene_changed()
+
+    def _flatten(self, body_data, parent_path="", out=None):
+        """Returns {path: (parent_path, the body's own fields)} in pre-order."""
+        if out is None:
+            out = {}
+        path = f"{parent_path}/{body_data.get('name', 'Unnamed')}"
+        out[path] = (parent_path, _body_fields(body_data))
+        for child_data in body_data.get("children", []):
+            self._flatten(child_data, path, out)
+        return out
+
+    def _build_recursive(self, body_data, parent_path=""):
         """
+        Recursive scene builder.
+        Creates a CelestialBody and its children if they exist. Every node is
+        a direct child of the root; the hierarchy lives in the orbit engine.
+        """
+        path = f"{parent_path}/{body_data.get('name', 'Unnamed')}"
+        self._create_body(body_data, path)
+
+        if "children" in body_data:
+            for child_data in body_data.get("children", []):
+                self._build_recursive(child_data, path)
+
+    def _build_from_file(self, i, parent_path=""):
+        """Builds body i of the scene file, and its children unless they can wait for the camera."""
+        f = self.scene_file
+        path = f"{parent_path}/{f.name(i)}"
+        self._create_body(f.body(i), path, self._file_state(i))
+        children = f.children(i)
+        if self._lazy and f.depth[i] > 0 and children:
+            self._subtrees[path] = i
+            return
+        for j in children:
+            self._build_from_file(j, path)
+
+    def _file_state(self, i):
+        """Angles body i would have now had it been built with the rest of the scene."""
+        f, elapsed = self.scene_file, self.orbit_engine.time - self._build_time
+        return (
+            float(f.orbit_speed[i] * elapsed % 360),
+            float(f.rotation_speed[i] * elapsed),
+            float(f.overlay_speed[i] * elapsed),
+        )
+
+    def stream_subtrees_task(self, task):
+        """Builds the children of scene file bodies the camera approaches and drops those it leaves."""
+        if self._subtrees and self.app.camera is not None:
+            self._stream_subtrees()
+        return task.again
+
+    def _stream_subtrees(self):
+        paths = list(self._subtrees)
+        index = np.array([self._subtrees[p] for p in paths])
+        slots = [self.bodies[p]._orbit_index for p in paths]
+        camera = self.floating_origin.camera_world()
+        distance = np.linalg.norm(self.orbit_engine.world_positions()[slots] - camera, axis=1)
+        reach = self.scene_file.extent[index] * subtree_load_distance.getValue()
+
+        changed = False
+        for path, d, r in zip(paths, distance, reach):
+            if path not in self._subtrees:
+                continue
+            if path not in self._loaded_subtrees and d < r:
+                for j in self.scene_file.children(self._subtrees[path]):
+                    self._build_from_file(j, path)
+                self._loaded_subtrees.add(path)
+                changed = True
+            elif path in self._loaded_subtrees and d > r * SUBTREE_UNLOAD_MARGIN:
+                self._unload_subtree(path)
+                changed = True
+        if changed:
+            self._scene_changed()
+
+    def _unload_subtree(self, path):
+        prefix = path + "/"
+        for child_path in reversed([p for p in self.bodies if p.startswith(prefix)]):
+            self._remove_body(child_path)
+        for child_path in [p for p in self._subtrees if p.startswith(prefix)]:
+            del self._subtrees[child_path]
+            self._loaded_subtrees.discard(child_path)
+        self._loaded_subtrees.discard(path)
+
+    def _create_body(self, body_data, path, state=None):
+        parent = self.bodies.get(path.rpartition("/")[0])
+        if body_data.get("type") == "belt":
+            body = self._create_belt(body_data, self.root_node, path, parent)
+            body.update(self.orbit_engine.time)
+            self.belts[path] = body
+        else:
+            body = self._create_celestial_body(body_data, self.root_node, path, parent, state)
+            self.belts.pop(path, None)
+
+        self.bodies[path] = body
+        self._body_data[path] = _body_fields(body_data)
+        return body
+
+    def body_at(self, origin, direction):
+        """The body nearest along a render-space ray, or None."""
+        hit = self.picking.pick(self.floating_origin.to_world(origin), direction)
+        return self.orbit_engine.bodies[hit[0]] if hit else None
+
+    def _create_belt(self, body_data, parent_node, path, parent):
+        texture = body_data.get("texture", None)
+        return AsteroidBelt(
+            name=body_data.get("name", "Unnamed"),
+            app=self.app,
+            parent_node=parent_node,
+            count=body_data.get("count", 1000),
+            inner_radius=body_data.get("inner_radius", 10.0),
+            outer_radius=body_data.get("outer_radius", 15.0),
+            inner_orbit_speed=body_data.get("inner_orbit_speed", 5.0),
+            max_eccentricity=body_data.get("max_eccentricity", 0.1),
+            inclination_spread=body_data.get("inclination_spread", 3.0),
+            min_size=body_data.get("min_size", 0.02),
+            max_size=body_data.get("max_size", 0.08),
+            texture_path='../' + texture if texture else None,
+            color=body_data.get("color", (0.6, 0.55, 0.5, 1)),
+            seed=body_data.get("seed", 0),
+            path=path,
+            registry=self.orbit_engine,
+            parent=parent,
+            mass=body_data.get("mass"),
+        )
+
+    def _create_celestial_body(self, body_data, parent_node, path, parent, state=None):
         name = body_data.get("name", "Unnamed")
         radius = body_data.get("radius", 1.0)
         orbit_radius = body_data.get("orbit_radius", 0.0)
@@ -46,10 +359,45 @@ class SceneManager:
             inclination=inclination,
             rings=rings_data,
             overlay=overlay,
+            path=path,
+            registry=self.orbit_engine,
+            parent=parent,
+            kind=body_data.get("type", "planet"),
+            mass=body_data.get("mass"),
+            debug_orbit=body_data.get("debug_orbit", False),
+            **self._angles(state),
         )
+        return body
 
-        self.app.taskMgr.add(body.update_task, f"update-{name}")
+    @staticmethod
+    def _angles(state):
+        if not state:
+            return {}
+        orbit_angle, rotation_angle, overlay_angle = state
+        return dict(orbit_angle=orbit_angle, rotation_angle=rotation_angle, overlay_angle=overlay_angle)
 
-        if "children" in body_data: 
-            for child_data in body_data.get("children", []):
-                self._build_recursive(child_data, body.node)
+    def _remove_body(self, path):
+        body = self.bodies.pop(path)
+        self.belts.pop(path, None)
+        del self._body_data[path]
+        self.app.asset_loader.cancel(path)
+        self.orbit_engine.unregister(body)
+        body.node.removeNode()
+
+    def _replace_body(self, path, body_data):
+        """Rebuilds one edited body in place, keeping its phase and its children."""
+        old = self.bodies[path]
+        engine = self.orbit_engine
+        state = engine.angles_of(old._orbit_index)
+        self.app.asset_loader.cancel(path)
+
+        new = self._create_body(body_data, path, state)
+        for child_path, child in self.bodies.items():
+            if child_path.rpartition("/")[0] == path:
+                engine.reparent(child._orbit_index, new._orbit_index)
+
+        engine.unregister(old)
+        old.node.removeNode()
+
+    def _release_textures(self):
+        self.app.texture_manager.retain_only(list(self.bodies) + [STARFIELD_OWNER])
@@ -0,0 +1,161 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import queue
+import select
+import struct
+import threading
+import time
+
+from core.scene_file import BINARY_SUFFIX, SceneFile
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO    = 0x00000080
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class _InotifyBackend:
+    """Blocks on inotify events for one file by watching its directory."""
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        directory, self.name = os.path.split(path)
+        wd = libc.inotify_add_watch(self.fd, directory.encode(), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout):
+        """Returns True if the watched file was written or replaced within timeout."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        changed = False
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset < len(buf):
+            _, _, _, name_len = _INOTIFY_EVENT.unpack_from(buf, offset)
+            offset += _INOTIFY_EVENT.size
+            name = buf[offset:offset + name_len].rstrip(b"\0").decode(errors="replace")
+            offset += name_len
+            changed = changed or name == self.name
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PollingBackend:
+    """Fallback for platforms without inotify: stats the file off the render thread."""
+
+    def __init__(self, path, interval=0.25):
+        self.path = path
+        self.interval = interval
+        self._stamp = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            stamp = self._stat()
+            if stamp != self._stamp:
+                self._stamp = stamp
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+class SceneWatcher:
+    """
+    Watches scene.json from a background thread.
+
+    Bursts of writes are debounced, the file is parsed in one read and only
+    well-formed scenes are handed to the main loop through a queue, so a
+    half-written save is never applied. A binary scene is reopened as a
+    SceneFile; convert_scene.py replaces it atomically.
+    """
+
+    def __init__(self, path, debounce=0.2):
+        self.path = os.path.abspath(path)
+        self.debounce = debounce
+        self.updates = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last = None
+
+    def start(self):
+        self._last = self._read()
+        self._thread = threading.Thread(target=self._run, name="scene-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def poll(self):
+        """Returns the newest parsed scene, or None. Never blocks."""
+        scene = None
+        while True:
+            try:
+                scene = self.updates.get_nowait()
+            except queue.Empty:
+                return scene
+
+    def _make_backend(self):
+        try:
+            return _InotifyBackend(self.path)
+        except (OSError, AttributeError):
+            return _PollingBackend(self.path)
+
+    def _run(self):
+        backend = self._make_backend()
+        try:
+            while not self._stop.is_set():
+                if not backend.wait(0.5):
+                    continue
+                while backend.wait(self.debounce):
+                    pass
+                scene = self._read()
+                if scene is not None and scene != self._last:
+                    self._last = scene
+                    self.updates.put(scene)
+        finally:
+            backend.close()
+
+    def _read(self):
+        if self.path.endswith(BINARY_SUFFIX):
+            try:
+                return SceneFile(self.path)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable scene file: {e}")
+                return None
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            scene = json.loads(raw)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable scene file: {e}")
+            return None
+        if not isinstance(scene, dict) or "name" not in scene:
+            print("Ignoring scene file without a root body")
+            return None
+        return scene
@@ -0,0 +1,143 @@
+import time
+
+import numpy as np
+from panda3d.core import ConfigVariableDouble
+
+from core.orbit_engine import OrbitEngine
+from core.recorder import Recorder
+from core.scene_file import SceneFile, load_scene
+
+fixed_timestep = ConfigVariableDouble(
+    'sim-fixed-timestep', 1.0 / 120.0,
+    'Simulation seconds advanced by every fixed step.'
+)
+max_steps_per_frame = 240
+
+
+class Simulation:
+    """
+    Fixed-timestep driver around an OrbitEngine.
+
+    Results depend only on the number of steps taken, never on the frame
+    rate: the renderer feeds real time into advance(), which runs as many
+    whole steps as fit, while headless runs call run() directly.
+    """
+
+    def __init__(self, engine=None, dt=None):
+        self.engine = engine if engine is not None else OrbitEngine()
+        self.dt = dt if dt is not None else fixed_timestep.getValue()
+        self.time = 0.0
+        self.steps = 0
+        self.paths = []
+        self._accumulator = 0.0
+
+    @classmethod
+    def from_scene(cls, scene_data, dt=None, workers=None):
+        """Builds a window-less simulation from parsed scene.json data or a SceneFile."""
+        sim = cls(dt=dt)
+        if isinstance(scene_data, SceneFile):
+            sim._add_file(scene_data)
+        else:
+            sim._add_recursive(scene_data, -1, "")
+        workers = scene_data.get("workers", 0) if workers is None else workers
+        sim.engine.set_physics(scene_data.get("physics", "kepler"), workers)
+        return sim
+
+    def _add_recursive(self, body_data, parent, parent_path):
+        path = f"{parent_path}/{body_data.get('name', 'Unnamed')}"
+        overlay = body_data.get("overlay") or {}
+        i = self.engine.add_orbit(
+            orbit_radius=body_data.get("orbit_radius", 0.0),
+            eccentricity=body_data.get("eccentricity", 0.0),
+            inclination=body_data.get("inclination", 0.0),
+            orbit_speed=body_data.get("orbit_speed", 0.0),
+            rotation_speed=body_data.get("rotation_speed", 0.0),
+            overlay_speed=overlay.get("speed", 0.0) if overlay.get("texture") else 0.0,
+            parent=parent,
+            mass=body_data.get("mass"),
+        )
+        self.paths.append(path)
+        for child_data in body_data.get("children", []):
+            self._add_recursive(child_data, i, path)
+
+    def _add_file(self, scene_file):
+        """Adds every body of a SceneFile straight from its columns."""
+        first = self.engine.extend(
+            parent=np.where(scene_file.parent >= 0, scene_file.parent + self.engine.count, -1),
+            orbit_radius=scene_file.orbit_radius,
+            eccentricity=scene_file.eccentricity,
+            inclination=scene_file.inclination,
+            orbit_speed=scene_file.orbit_speed,
+            rotation_speed=scene_file.rotation_speed,
+            overlay_speed=scene_file.overlay_speed,
+            mass=scene_file.mass,
+        )
+        self.paths.extend(scene_file.paths())
+        return first
+
+    def step(self):
+        self.time = self.engine.step(self.dt)
+        self.steps += 1
+
+    def seek(self, t):
+        """Jumps straight to simulated time t."""
+        self.steps = round(t / self.dt)
+        self.time = t
+        if self.engine.time != t:
+            self.engine.set_time(t)
+        self._accumulator = 0.0
+
+    def advance(self, elapsed):
+        """
+        Runs every whole fixed step that fits in elapsed seconds plus the
+        carried remainder. With a parallel integrator the steps are only
+        queued, and the return value counts the ones that have finished.
+        """
+        self._accumulator += elapsed
+        n = min(int(self._accumulator / self.dt), max_steps_per_frame)
+        self._accumulator = min(self._accumulator - n * self.dt, self.dt)
+        if self.engine.asynchronous:
+            done = self.engine.step_async(self.dt, n, max_steps_per_frame)
+            self.steps += done
+            self.time = self.engine.time
+            return done
+        for _ in range(n):
+            self.step()
+        return n
+
+    def run(self, steps, sample_every=0, on_sample=None):
+        """Runs steps fixed steps as fast as possible, calling on_sample(sim) every sample_every steps."""
+        for k in range(1, steps + 1):
+            self.step()
+            if sample_every and on_sample and k % sample_every == 0:
+                on_sample(self)
+
+
+def run_headless(scene_path, steps, dt=None, sample_every=0, output=None, workers=None, record=None):
+    """Entry point for `python -m sim --headless`."""
+    scene_data = load_scene(scene_path)
+    sim = Simulation.from_scene(scene_data, dt, workers)
+    samples, times = [], []
+    recorder = Recorder(record, sim.engine, lambda: sim.paths) if record else None
+
+    def on_step(s):
+        if recorder is not None:
+            recorder.capture()
+        if output and sample_every and s.steps % sample_every == 0:
+            samples.append(s.engine.world_positions().astype(np.float32))
+            times.append(s.time)
+
+    start = time.perf_counter()
+    sim.run(steps, 1 if recorder is not None else (sample_every if output else 0), on_step)
+    elapsed = time.perf_counter() - start
+    sim.engine.close()
+    if recorder is not None:
+        recorder.close()
+
+    print(f"{sim.engine.count} bodies, {steps} steps of {sim.dt:.6f}s "
+          f"({sim.time:.1f} simulated s) in {elapsed:.2f}s "
+          f"({steps / max(elapsed, 1e-9):,.0f} steps/s)")
+    if output:
+        np.savez(output, paths=np.array(sim.paths), time=np.array(times), positions=np.array(samples))
+        print(f"Wrote {len(samples)} samples to {output}")
+    return sim
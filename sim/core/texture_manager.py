@@ -0,0 +1,168 @@
+import json
+import os
+from collections import OrderedDict
+
+from panda3d.core import (
+    ConfigVariableInt, Filename, TexturePool, VirtualFileSystem, getModelPath
+)
+
+texture_budget_mb = ConfigVariableInt(
+    'texture-cache-budget-mb', 256,
+    'Resident texture memory above which unreferenced textures are unloaded.'
+)
+
+STARFIELD_OWNER = "<starfield>"
+
+TEXTURE_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', 'assets', 'cache', 'textures'
+)
+
+
+def _load_cache_manifest(cache_dir=TEXTURE_CACHE_DIR):
+    """Maps absolute source paths to their entries written by preprocess_textures.py."""
+    try:
+        with open(os.path.join(cache_dir, 'manifest.json'), 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {
+        os.path.normpath(os.path.join(cache_dir, source)): entry
+        for source, entry in manifest.get('textures', {}).items()
+    }
+
+
+def _texture_bytes(texture):
+    if texture.hasRamImage() and texture.getRamImageCompression() != texture.CM_off:
+        return sum(texture.getRamMipmapImageSize(n) for n in range(texture.getNumRamMipmapImages()))
+    return texture.estimateTextureMemory()
+
+
+class _TextureEntry:
+    __slots__ = ("texture", "nbytes", "owners")
+
+    def __init__(self, texture, nbytes):
+        self.texture = texture
+        self.nbytes  = nbytes
+        self.owners  = set()
+
+
+class TextureManager:
+    """
+    Loads every texture once per resolved path and tracks which bodies use it.
+
+    When a scene diff drops bodies, retain_only() unloads the textures no
+    remaining body uses. Textures released one owner at a time through
+    release() stay resident in LRU order, for an owner that comes straight
+    back, and are unloaded oldest-first whenever the resident size exceeds
+    the budget.
+    """
+
+    def __init__(self, budget_bytes=None):
+        if budget_bytes is None:
+            budget_bytes = texture_budget_mb.getValue() * 1024 * 1024
+        self.budget_bytes = budget_bytes
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._vfs = VirtualFileSystem.getGlobalPtr()
+        self._cache_manifest = _load_cache_manifest()
+
+    def resolve(self, path):
+        """Resolves a texture path against the model-path so aliases share one key."""
+        fn = Filename(path)
+        self._vfs.resolveFilename(fn, getModelPath().getValue())
+        fn.makeAbsolute()
+        return fn.getFullpath()
+
+    def load_path(self, key):
+        """
+        Returns the file to actually read for key: the preprocessed .txo if
+        preprocess_textures.py built one for the current source, else key itself.
+        """
+        entry = self._cache_manifest.get(os.path.normpath(Filename(key).toOsSpecific()))
+        if entry is None:
+            return key
+        cached = os.path.join(TEXTURE_CACHE_DIR, entry['cache'])
+        try:
+            st = os.stat(Filename(key).toOsSpecific())
+        except OSError:
+            return key
+        if (st.st_size, st.st_mtime_ns) != (entry['size'], entry['mtime_ns']) or not os.path.exists(cached):
+            return key
+        return Filename.fromOsSpecific(cached).getFullpath()
+
+    def load(self, path, owner):
+        """Returns the texture at path, loading it on first use, and records owner."""
+        texture = self.get_cached(path, owner)
+        if texture is None:
+            key = self.resolve(path)
+            texture = self.adopt(key, loader.loadTexture(self.load_path(key)), owner)
+        return texture
+
+    def get_cached(self, path, owner):
+        """Returns the resident texture for path and records owner, or None on a miss."""
+        key = self.resolve(path)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        entry.owners.add(owner)
+        return entry.texture
+
+    def adopt(self, key, texture, owner):
+        """Registers a texture loaded elsewhere (e.g. on a worker thread) under key."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            entry = _TextureEntry(texture, _texture_bytes(texture))
+            self._entries[key] = entry
+            self.resident_bytes += entry.nbytes
+        else:
+            self._entries.move_to_end(key)
+        entry.owners.add(owner)
+        self.trim()
+        return entry.texture
+
+    def release(self, owner):
+        """Drops owner from every texture it holds and trims the cache."""
+        for entry in self._entries.values():
+            entry.owners.discard(owner)
+        self.trim()
+
+    def retain_only(self, owners):
+        """Releases every owner that is not in owners and unloads the textures left unused."""
+        owners = set(owners)
+        for entry in self._entries.values():
+            entry.owners &= owners
+        self.evict_unowned()
+
+    def evict_unowned(self):
+        """Unloads every texture no owner holds, whatever the budget."""
+        for key in [k for k, e in self._entries.items() if not e.owners]:
+            self._unload(key)
+
+    def trim(self):
+        """Unloads unreferenced textures, least recently used first, until within budget."""
+        if self.resident_bytes <= self.budget_bytes:
+            return
+        for key in [k for k, e in self._entries.items() if not e.owners]:
+            self._unload(key)
+            if self.resident_bytes <= self.budget_bytes:
+                return
+
+    def _unload(self, key):
+        entry = self._entries.pop(key)
+        entry.texture.releaseAll()
+        TexturePool.releaseTexture(entry.texture)
+        self.resident_bytes -= entry.nbytes
+
+    def stats(self):
+        return {
+            "textures": len(self._entries),
+            "resident_bytes": self.resident_bytes,
+            "budget_bytes": self.budget_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,194 @@
+import numpy as np
+from panda3d.core import ConfigVariableInt
+
+from objects.celestial_body import LOD_MIN_PIXEL_RADIUS, _lod_distance_scale
+
+cosmetic_stride = ConfigVariableInt(
+    'sim-cosmetic-stride', 4,
+    'Frames between cosmetic updates (axial rotation, cloud and ring spin) of bodies drawn at the coarsest detail.'
+)
+
+# Below the smallest sphere level a body is a point sprite and gets no
+# cosmetic updates; from the second smallest on it gets one every frame.
+COSMETIC_MIN_PIXELS  = LOD_MIN_PIXEL_RADIUS[-1]
+COSMETIC_FULL_PIXELS = LOD_MIN_PIXEL_RADIUS[-2]
+# A body whose whole orbit spans less than this on screen cannot visibly
+# move between two frames, so its position is written every `stride` frames.
+ORBIT_MIN_PIXELS     = 1.0
+
+
+class VisibilityScheduler:
+    """
+    Decides every frame which bodies get scene-graph writes.
+
+    Each body is tested against the camera frustum twice, in one numpy pass
+    each: with the sphere around its whole subtree (its moons' orbits
+    included), which decides whether its node position is written, and
+    with the sphere around its own geometry, which together with its size
+    on screen decides whether its cosmetic angles (axial rotation, cloud
+    overlay, ring spin) are: every frame when large, every `stride` frames
+    when small, not at all while sub-pixel or out of view. Positions of
+    bodies whose orbit is sub-pixel on screen are also written every
+    `stride` frames, except on the frame they come into view.
+
+    A node whose subtree leaves the view is hidden rather than left at its
+    last position, which may still be on screen while the body itself has
+    moved on; it is shown again, with a fresh position, when it returns.
+
+    Every value is evaluated at the engine's current time rather than
+    accumulated, so skipped updates cost nothing in accuracy and a body
+    coming back into view is written exactly. Nodes are only written when
+    the time or the FloatingOrigin changed since their last write; their
+    positions are world positions relative to that origin.
+
+    view_range overrides the lens near/far for the frustum test when the
+    view is drawn in depth slices, and depth_extent is the camera-space
+    depth range covered by visible bodies, or None.
+    """
+
+    def __init__(self, app, engine, root_node, origin):
+        self.app = app
+        self.engine = engine
+        self.root_node = root_node
+        self.origin = origin
+        self.stride = max(1, cosmetic_stride.getValue())
+        self.frame = 0
+        self.written = (0, 0)
+        self.view_range = None
+        self.depth_extent = None
+        self._reach = np.zeros(0)
+        self._shown = None
+        self.invalidate()
+
+    def invalidate(self):
+        """Forgets what was written, e.g. after bodies were added or a replay moved the nodes."""
+        self._dirty = True
+
+    def release(self):
+        """Shows every node this hid, before something else takes over writing them (a replay)."""
+        if not self._dirty and self._shown is not None:
+            for i in np.flatnonzero(~self._shown).tolist():
+                if self.engine.bodies[i] is not None:
+                    self.engine.bodies[i].node.show()
+        self.invalidate()
+
+    def _rebuild(self):
+        engine = self.engine
+        n = engine.count
+        parent, depth = engine.parent[:n], engine.depth[:n]
+        # A subtree reaches as far as its farthest descendant's orbit plus that descendant's own reach.
+        self._reach = engine.extent[:n].copy()
+        self._orbit_reach = engine.orbit_radius[:n] * (1 + engine.eccentricity[:n])
+        for level in range(int(depth.max(initial=0)), 0, -1):
+            idx = np.flatnonzero(depth == level)
+            np.maximum.at(self._reach, parent[idx], self._orbit_reach[idx] + self._reach[idx])
+
+        self._is_belt = np.zeros(n, dtype=bool)
+        if "belt" in engine.kinds:
+            self._is_belt = engine.kind[:n] == engine.kinds.index("belt")
+        self._ring_speed = np.zeros(n)
+        for i, body in enumerate(engine.bodies):
+            ring_np = getattr(body, "ring_np", None)
+            if ring_np is not None:
+                self._ring_speed[i] = ring_np.getPythonTag("ring_speed")
+
+        self._position_time = np.full(n, np.nan)
+        self._origin_version = self.origin.version
+        # None until the first update, which then sets every node's visibility once.
+        self._shown = None
+        self._cosmetic_time = np.full(n, np.nan)
+        self._time = None
+        self._dirty = False
+
+    def _camera_space(self, points):
+        mat = self.root_node.getMat(self.app.cam)
+        m = np.array([tuple(mat.getRow(i)) for i in range(4)])
+        return points @ m[:3, :3] + m[3, :3]
+
+    def _in_view(self, p, radius):
+        """Which camera-space spheres intersect the lens frustum (camera looks down +Y)."""
+        lens = self.app.camLens
+        near, far = self.view_range or (lens.getNear(), lens.getFar())
+        h, v = np.radians(lens.getFov()) / 2
+        x, y, z = p[:, 0], p[:, 1], p[:, 2]
+        return ((y + radius > near) & (y - radius < far)
+                & (np.abs(x) * np.cos(h) - y * np.sin(h) < radius)
+                & (np.abs(z) * np.cos(v) - y * np.sin(v) < radius))
+
+    def update(self):
+        """Writes the nodes that need it for the engine's current time."""
+        engine = self.engine
+        if self._dirty or len(self._reach) != engine.count:
+            self._rebuild()
+        n, t = engine.count, engine.time
+        if t != self._time:
+            self._world = engine.world_positions()
+            self._time = t
+        # A rebase moves every node in render space, so all of them are due at once.
+        rebased = self.origin.version != self._origin_version
+        if rebased:
+            self._position_time[:] = np.nan
+            self._origin_version = self.origin.version
+        render = self.origin.to_render(self._world)
+
+        extent = engine.extent[:n]
+        if getattr(self.app, "cam", None) is None or getattr(self.app, "camLens", None) is None:
+            subtree = own = np.ones(n, dtype=bool)
+            pixels = orbit_pixels = np.full(n, np.inf)
+            self.depth_extent = None
+        else:
+            p = self._camera_space(render)
+            subtree = self._in_view(p, self._reach)
+            own = subtree & self._in_view(p, extent)
+            depth = p[own, 1]
+            self.depth_extent = ((float((depth - extent[own]).min()),
+                                  float((depth + extent[own]).max())) if depth.size else None)
+            per_unit = _lod_distance_scale(self.app) / np.maximum(np.linalg.norm(p, axis=1), 1e-9)
+            pixels = extent * per_unit
+            orbit_pixels = self._orbit_reach * per_unit
+        turn = (np.arange(n) + self.frame) % self.stride == 0
+
+        bodies = engine.bodies
+        shown = ~subtree if self._shown is None else self._shown
+        entered = subtree & ~shown
+        for i in np.flatnonzero(shown & ~subtree).tolist():
+            if bodies[i] is not None:
+                bodies[i].node.hide()
+        for i in np.flatnonzero(entered).tolist():
+            if bodies[i] is not None:
+                bodies[i].node.show()
+        self._shown = subtree
+
+        moved = subtree & (self._position_time != t)
+        if not rebased:
+            moved &= (orbit_pixels >= ORBIT_MIN_PIXELS) | entered | turn
+        moved = np.flatnonzero(moved)
+        for i, (x, y, z) in zip(moved.tolist(), render[moved].tolist()):
+            if bodies[i] is not None:
+                bodies[i].node.setPos(x, y, z)
+        self._position_time[moved] = t
+
+        stale = own & (self._cosmetic_time != t)
+        belts = np.flatnonzero(stale & self._is_belt)
+        for i in belts.tolist():
+            bodies[i].update(t)
+        due = stale & ~self._is_belt & (pixels >= COSMETIC_MIN_PIXELS)
+        due &= (pixels >= COSMETIC_FULL_PIXELS) | turn
+        due = np.flatnonzero(due)
+        rotation = engine.rotation_angles()[due].tolist()
+        overlay = engine.overlay_angles()[due].tolist()
+        ring = (self._ring_speed[due] * t).tolist()
+        for i, h, overlay_h, ring_h in zip(due.tolist(), rotation, overlay, ring):
+            body = bodies[i]
+            if body is None:
+                continue
+            body.model.setH(h)
+            if body.overlay_np:
+                body.overlay_np.setHpr(overlay_h, -90, 0)
+            if body.ring_np:
+                body.ring_np.setH(ring_h)
+        self._cosmetic_time[belts] = t
+        self._cosmetic_time[due] = t
+
+        self.frame += 1
+        self.written = (len(moved), len(due) + len(belts))
@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+from panda3d.core import (
+    BoundingSphere, GeomEnums, Point3, Shader, Texture, TextureStage, Vec4
+)
+
+from objects.celestial_body import _make_sphere_geom
+from utils.mesh_cache import mesh_cache
+from utils.orbit_math import kepler_positions
+
+ROCK_DETAIL   = (6, 8)
+BELT_SHADER   = ("../assets/shaders/belt.vert", "../assets/shaders/belt.frag")
+BELT_AMBIENT  = 0.08
+
+
+class AsteroidBelt:
+    """
+    A swarm of small bodies around the parent drawn with a single instanced
+    Geom. Orbits are generated from distribution settings instead of being
+    listed one by one, and every frame all positions are solved in one numpy
+    pass and written into a buffer texture that the vertex shader indexes
+    with gl_InstanceID.
+
+    The belt has a BodyRegistry row like any body, so reloads and n-body
+    scenes handle it; the asteroids themselves are massless tracers.
+    """
+
+    def __init__(
+        self,
+        name,
+        app,
+        parent_node,
+        count=1000,
+        inner_radius=10.0,
+        outer_radius=15.0,
+        inner_orbit_speed=5.0,
+        max_eccentricity=0.1,
+        inclination_spread=3.0,
+        min_size=0.02,
+        max_size=0.08,
+        texture_path=None,
+        color=(0.6, 0.55, 0.5, 1),
+        seed=0,
+        path=None,
+        registry=None,
+        parent=None,
+        mass=None,
+    ):
+        self.name  = name
+        self.path  = path or name
+        self.app   = app
+        self.count = count
+        self.overlay_np = None
+        # The belt itself is a row with no orbit, sitting at its parent's origin.
+        reach = outer_radius * (1 + max_eccentricity) + max_size
+        registry.add_body(self, kind="belt", parent=parent, mass=mass, extent=reach)
+
+        rng = np.random.default_rng(seed)
+        # Uniform surface density between the two radii, speeds from Kepler's third law.
+        self._a     = np.sqrt(rng.uniform(inner_radius ** 2, outer_radius ** 2, count))
+        self._e     = rng.uniform(0.0, max_eccentricity, count)
+        self._b     = self._a * np.sqrt(1 - self._e ** 2)
+        self._inc   = rng.normal(0.0, inclination_spread, count)
+        self._speed = inner_orbit_speed * (self._a / inner_radius) ** -1.5
+        self._phase = rng.uniform(0.0, 360.0, count)
+        node_angle  = rng.uniform(0.0, 2 * math.pi, count)
+        self._cos_node = np.cos(node_angle)
+        self._sin_node = np.sin(node_angle)
+        sizes = np.exp(rng.uniform(math.log(min_size), math.log(max_size), count))
+        self._local = np.empty((count, 3))
+
+        self.node  = parent_node.attachNewNode(self.name)
+        self.model = self.node.attachNewNode(mesh_cache.make_node('belt_rock', _make_sphere_geom, 1.0, *ROCK_DETAIL))
+        self.model.setInstanceCount(count)
+        # The Geom only spans one unit rock, so give the node the whole belt's bounds.
+        self.model.node().setBounds(BoundingSphere(Point3(0, 0, 0), reach))
+        self.model.node().setFinal(True)
+
+        self.instances = Texture(f"{name}_instances")
+        self.instances.setupBufferTexture(count, Texture.T_float, Texture.F_rgba32, GeomEnums.UH_dynamic)
+        self._instance_data()[:, 3] = sizes
+
+        self.model.setShader(Shader.load(Shader.SL_GLSL, vertex=BELT_SHADER[0], fragment=BELT_SHADER[1]))
+        self.model.setShaderInput("instances", self.instances)
+        self.model.setShaderInput("tint", Vec4(*color))
+        self.model.setShaderInput("ambient", BELT_AMBIENT)
+        self.model.setShaderInput("light_pos", Point3(0, 0, 0))
+
+        if texture_path:
+            app.asset_loader.request_texture(texture_path, self.path, self._apply_texture)
+
+    def _instance_data(self):
+        """The buffer texture's RAM image as a writable (count, 4) float32 array."""
+        return np.frombuffer(memoryview(self.instances.modifyRamImage()), dtype=np.float32).reshape(self.count, 4)
+
+    def _apply_texture(self, tex):
+        if self.node.isEmpty():
+            return
+        tex.setMinfilter(tex.FT_linear_mipmap_linear)
+        self.model.setTexture(TextureStage.getDefault(), tex)
+
+    def update(self, t):
+        """Moves every asteroid to its position at simulated time t."""
+        mean_anomaly = np.mod(self._phase + self._speed * t, 360)
+        local = kepler_positions(self._a, self._b, self._e, self._inc, mean_anomaly, out=self._local)
+        data = self._instance_data()
+        data[:, 0] = local[:, 0] * self._cos_node - local[:, 1] * self._sin_node
+        data[:, 1] = local[:, 0] * self._sin_node + local[:, 1] * self._cos_node
+        data[:, 2] = local[:, 2]
+
+        sun = getattr(self.app, 'sun_light_np', None)
+        if sun is not None:
+            self.model.setShaderInput("light_pos", sun.getPos(self.node))
@@ -1,85 +1,146 @@
 import math
+import numpy as np
 from panda3d.core import (
     PointLight, AmbientLight, Vec4,
-    Material, Vec3, LineSegs, NodePath, TextureStage, TransparencyAttrib,
+    Material, Vec3, NodePath, TextureStage, TransparencyAttrib,
     GeomVertexData, GeomVertexFormat, GeomVertexWriter,
-    GeomTriangles, Geom, GeomNode, Texture, BitMask32, CollisionNode, CollisionSphere, 
-    BitMask32, CollisionNode, CollisionSphere, Material
+    Geom, Texture, LODNode, GeomPoints
 )
 
-from panda3d.core import ClockObject
-globalClock = ClockObject.getGlobalClock()
+from utils.geom_arrays import grid_triangles, make_triangles, make_vertex_data
+from utils.mesh_cache import mesh_cache
 
-from utils.orbit_math import clamp_angle
+PLACEHOLDER_COLOR = (0.45, 0.45, 0.5, 1)
 
-def _make_sphere_geom(radius=1.0, lat_steps=16, long_steps=32):
-    fmt     = GeomVertexFormat.get_v3n3t2()
-    vdata   = GeomVertexData('sphere', fmt, Geom.UHStatic)
-    vwriter = GeomVertexWriter(vdata, 'vertex')
-    nwriter = GeomVertexWriter(vdata, 'normal')
-    uvwriter= GeomVertexWriter(vdata, 'texcoord')
-
-    for i in range(lat_steps+1):
-        phi = math.pi * i / lat_steps
-        v   = i / lat_steps
-        for j in range(long_steps+1):
-            theta = 2*math.pi * j / long_steps
-            u     = j / long_steps
-            x = radius*math.sin(phi)*math.cos(theta)
-            y = radius*math.sin(phi)*math.sin(theta)
-            z = radius*math.cos(phi)
-            vwriter.add_data3(x, y, z)
-            nwriter.add_data3(x/radius, y/radius, z/radius)
-            uvwriter.add_data2(u, 1-v)
-
-    tris = GeomTriangles(Geom.UHStatic)
-    stride = long_steps+1
-    for i in range(lat_steps):
-        for j in range(long_steps):
-            v0 =  i   * stride + j
-            v1 =  i   * stride + j+1
-            v2 = (i+1)* stride + j
-            v3 = (i+1)* stride + j+1
-            tris.add_vertices(v0, v2, v1)
-            tris.add_vertices(v1, v2, v3)
+# (lat_steps, long_steps) per level of detail, from close-up to far away, and
+# the smallest on-screen radius in pixels each level is used for. Below the
+# last one a body collapses to a point sprite.
+SPHERE_LODS          = ((64, 128), (32, 64), (16, 32), (8, 16))
+LOD_MIN_PIXEL_RADIUS = (160.0, 48.0, 12.0, 2.0)
+LOD_FAR_DISTANCE     = 1e9
+POINT_SPRITE_SIZE    = 2
+OVERLAY_SCALE        = 1.01
 
+def _make_sphere_geom(radius=1.0, lat_steps=16, long_steps=32):
+    phi   = np.pi * np.arange(lat_steps + 1) / lat_steps
+    theta = 2 * np.pi * np.arange(long_steps + 1) / long_steps
+    u, v  = np.meshgrid(np.arange(long_steps + 1) / long_steps, np.arange(lat_steps + 1) / lat_steps)
+
+    x = radius * np.sin(phi)[:, None] * np.cos(theta)
+    y = radius * np.sin(phi)[:, None] * np.sin(theta)
+    z = np.broadcast_to((radius * np.cos(phi))[:, None], x.shape)
+    pos = np.stack((x, y, z), axis=-1).reshape(-1, 3)
+
+    vdata = make_vertex_data('sphere', GeomVertexFormat.get_v3n3t2(), {
+        'vertex': pos,
+        'normal': pos / radius,
+        'texcoord': np.stack((u.ravel(), 1 - v.ravel()), axis=1),
+    })
     geom = Geom(vdata)
-    geom.add_primitive(tris)
-    node = GeomNode('sphere')
-    node.add_geom(geom)
-    return node
+    geom.add_primitive(make_triangles(grid_triangles(lat_steps, long_steps)))
+    return geom
+
+def _make_point_geom():
+    fmt     = GeomVertexFormat.get_v3t2()
+    vdata   = GeomVertexData('point', fmt, Geom.UHStatic)
+    GeomVertexWriter(vdata, 'vertex').add_data3(0, 0, 0)
+    GeomVertexWriter(vdata, 'texcoord').add_data2(0.5, 0.5)
+    points = GeomPoints(Geom.UHStatic)
+    points.add_vertex(0)
+    geom = Geom(vdata)
+    geom.add_primitive(points)
+    return geom
+
+def _lod_distance_scale(app):
+    """Camera distance, in body radii, at which a body is one pixel in radius."""
+    lens = getattr(app, 'camLens', None)
+    win  = getattr(app, 'win', None)
+    vfov = lens.getFov()[1] if lens else 30.0
+    height = win.getYSize() if win else 600
+    return (height / 2) / math.tan(math.radians(vfov) / 2)
+
+def _make_lod_sphere(name, radius, distance_scale, point_sprite=True):
+    """
+    Builds an LODNode holding every sphere tessellation in SPHERE_LODS, switched by
+    the body's projected radius. Switch distances are in world units, so they are
+    computed from the body's radius rather than the unit sphere's.
+    """
+    lod_np = NodePath(LODNode(name))
+    lod = lod_np.node()
+    near = 0.0
+    for (lat, lon), pixels in zip(SPHERE_LODS, LOD_MIN_PIXEL_RADIUS):
+        far = radius * distance_scale / pixels
+        lod.addSwitch(far, near)
+        lod_np.attachNewNode(mesh_cache.make_node(f'sphere_{lat}x{lon}', _make_sphere_geom, 1.0, lat, lon))
+        near = far
+    if point_sprite:
+        lod.addSwitch(LOD_FAR_DISTANCE, near)
+        point_np = lod_np.attachNewNode(mesh_cache.make_node('point', _make_point_geom))
+        point_np.setRenderModeThickness(POINT_SPRITE_SIZE)
+        point_np.setRenderModePerspective(False)
+        point_np.setLightOff(1)
+        point_np.setShaderOff(1)
+    return lod_np
 
 def _make_ring_vertex_data(inner_radius, outer_radius, segments=64):
-    fmt    = GeomVertexFormat.get_v3t2()
-    vdata  = GeomVertexData('ring', fmt, Geom.UHStatic)
-    vwriter = GeomVertexWriter(vdata, 'vertex')
-    twriter = GeomVertexWriter(vdata, 'texcoord')
-
-    for i in range(segments + 1):
-        t = 2 * math.pi * i / segments
-        x_out, y_out = outer_radius * math.cos(t), outer_radius * math.sin(t)
-        vwriter.add_data3(x_out, y_out, 0)
-        twriter.add_data2((math.cos(t)*0.5 + 0.5), (math.sin(t)*0.5 + 0.5))
-        x_in, y_in = inner_radius * math.cos(t), inner_radius * math.sin(t)
-        vwriter.add_data3(x_in, y_in, 0)
-        twriter.add_data2(
-            (math.cos(t)*(inner_radius/outer_radius)*0.5 + 0.5),
-            (math.sin(t)*(inner_radius/outer_radius)*0.5 + 0.5)
-        )
-    return vdata
+    t = 2 * np.pi * np.arange(segments + 1) / segments
+    cos_t, sin_t = np.cos(t), np.sin(t)
+    ratio = inner_radius / outer_radius
+    # Rows alternate outer edge, inner edge around the ring.
+    pos = np.zeros((segments + 1, 2, 3))
+    pos[:, 0, 0], pos[:, 0, 1] = outer_radius * cos_t, outer_radius * sin_t
+    pos[:, 1, 0], pos[:, 1, 1] = inner_radius * cos_t, inner_radius * sin_t
+    uv = np.empty((segments + 1, 2, 2))
+    uv[:, 0, 0], uv[:, 0, 1] = cos_t * 0.5 + 0.5, sin_t * 0.5 + 0.5
+    uv[:, 1, 0], uv[:, 1, 1] = cos_t * ratio * 0.5 + 0.5, sin_t * ratio * 0.5 + 0.5
+    return make_vertex_data('ring', GeomVertexFormat.get_v3t2(), {
+        'vertex': pos.reshape(-1, 3),
+        'texcoord': uv.reshape(-1, 2),
+    })
 
 def _make_ring_primitive(segments=64):
-    tris = GeomTriangles(Geom.UHStatic)
-    for i in range(segments):
-        idx = 2 * i
-        tris.add_vertices(idx,   idx+1, idx+2)
-        tris.add_vertices(idx+2, idx+1, idx+3)
-    return tris
+    idx = 2 * np.arange(segments)[:, None]
+    return make_triangles(idx + np.array([0, 1, 2, 2, 1, 3]))
+
+def _make_ring_geom(inner_radius, outer_radius, segments=64):
+    geom = Geom(_make_ring_vertex_data(inner_radius, outer_radius, segments))
+    geom.add_primitive(_make_ring_primitive(segments))
+    return geom
+
+
+def _column(field):
+    """A read-only attribute backed by this body's row in the registry arrays."""
+    def get(self):
+        return float(getattr(self.registry, field)[self._orbit_index])
+    return property(get)
+
+
+def _angle(k):
+    def get(self):
+        return float(self.registry.angles_of(self._orbit_index)[k])
+    return property(get)
 
 
 class CelestialBody:
-    
-    planet_counter = 0
+    """
+    Scene-graph side of one body. Its numeric state lives in a row of the
+    BodyRegistry arrays and is read through properties, so an instance
+    only carries its node handles.
+    """
+
+    __slots__ = ("registry", "name", "path", "id", "_orbit_index", "node", "model", "ring_np", "overlay_np", "debug_orbit")
+
+    orbit_radius   = _column("orbit_radius")
+    _semi_minor    = _column("semi_minor")
+    eccentricity   = _column("eccentricity")
+    inclination    = _column("inclination")
+    orbit_speed    = _column("orbit_speed")
+    rotation_speed = _column("rotation_speed")
+    overlay_speed  = _column("overlay_speed")
+    radius         = _column("radius")
+    orbit_angle    = _angle(0)
+    rotation_angle = _angle(1)
+    overlay_angle  = _angle(2)
 
     def __init__(
         self,
@@ -96,39 +157,48 @@ class CelestialBody:
         debug_orbit=False,
         rings=None,
         overlay=None,
+        path=None,
+        registry=None,
+        parent=None,
+        kind="planet",
+        mass=None,
+        orbit_angle=0.0,
+        rotation_angle=0.0,
+        overlay_angle=0.0,
     ):
-        self.overlay_rotation_angle = 0.0
-        self.overlay_rotation_speed = overlay.get("speed", 0.0) if overlay else 0.0
-        self.name           = name
-        self.app            = app
-        self.orbit_radius   = orbit_radius
-        self.eccentricity   = eccentricity
-        self._semi_minor    = orbit_radius * math.sqrt(max(0, 1 - eccentricity**2))
-        self.orbit_speed    = orbit_speed
-        self.rotation_speed = rotation_speed
-        self.radius         = radius
-        self.texture_path   = texture_path
-        self.inclination    = inclination
-
-        self.orbit_angle    = 0.0
-        self.rotation_angle = 0.0
+        self.registry = registry
+        self.name     = name
+        self.path     = path or name
+        has_overlay   = bool(overlay and overlay.get("texture"))
+        registry.add_body(
+            self,
+            kind=kind,
+            radius=radius,
+            parent=parent,
+            mass=mass,
+            extent=max(radius * (OVERLAY_SCALE if has_overlay else 1), rings["outer_radius"] if rings else 0),
+            orbit_radius=orbit_radius,
+            eccentricity=eccentricity,
+            inclination=inclination,
+            orbit_speed=orbit_speed,
+            rotation_speed=rotation_speed,
+            overlay_speed=overlay.get("speed", 0.0) if has_overlay else 0.0,
+            orbit_angle=orbit_angle,
+            rotation_angle=rotation_angle,
+            overlay_angle=overlay_angle,
+        )
 
         self.node  = parent_node.attachNewNode(self.name)
 
-        sphere_node = _make_sphere_geom(1.0, 16, 32)
-        self.model = self.node.attachNewNode(sphere_node)
+        lod_scale  = _lod_distance_scale(app)
+        self.model = _make_lod_sphere(f"{name}_lod", self.radius, lod_scale)
+        self.model.reparentTo(self.node)
         self.model.setScale(self.radius)
-        self.overlay_np    = None
-        self.overlay_angle = 0.0
-        self.overlay_speed = 0.0
-        self.planet_counter += 1
-        
-        collider_node = CollisionNode(f"{name}_collider")
-        collider_node.setIntoCollideMask(BitMask32.bit(1))  
-        collider_node.addSolid(CollisionSphere(0, 0, 0, self.radius))
+        self.overlay_np = None
 
+        # Picking goes through SceneManager.picking, which indexes the radius.
         self.model.setTag("planet", "true")
-        self.model.setTag("planet_id", str(self.planet_counter))
+        self.model.setTag("planet_id", str(self.id))
 
         if self.name.lower() == 'sun':
             self.model.setLightOff()
@@ -137,26 +207,31 @@ class CelestialBody:
             mat.setAmbient(Vec4(0, 0, 0, 1))
             self.model.setMaterial(mat, 1)
 
+        if not hasattr(app, 'sun_light_np'):
+            sun_pl = PointLight('sun')
+            sun_pl.setColor(Vec4(1, 1, 0.9, 1))
+            sun_np = getattr(app, 'world_np', app.render).attachNewNode(sun_pl)
+            sun_np.setPos(0, 0, 0)
+            sun_pl.setAttenuation((1, 0, 0.0001))
+            amb = AmbientLight('ambient')
+            amb.setColor(Vec4(0.01, 0.01, 0.01, 1))
+            amb_np = app.render.attachNewNode(amb)
+            app.render.setLight(sun_np)
+            app.render.setLight(amb_np)
+            app.sun_light_np = sun_np
+            app.ambient_light_np = amb_np
+
         if self.name.lower() != 'sun':
             self.model.setShaderAuto()
             self.model.setLight(app.sun_light_np)
             self.model.setLight(app.ambient_light_np)
        
-        if self.texture_path:
-            tex = loader.loadTexture(self.texture_path)
-            tex.setMinfilter(tex.FT_linear_mipmap_linear)
-            tex.setWrapU(tex.WMRepeat)
-            tex.setWrapV(tex.WMClamp)
-            ts = TextureStage.getDefault()
-            ts.setMode(TextureStage.MModulate) 
-            self.model.setTexture(ts, tex)
-            self.model.setTexScale(ts, 1, 1)
-            self.model.setTransparency(TransparencyAttrib.M_alpha)
-
-        if debug_orbit and self.orbit_radius > 0:
-            self._make_orbit_ring(parent_node)
-
-        self.node.setPos(self._inclined_pos(self.orbit_angle))
+        if texture_path:
+            self.model.setColor(PLACEHOLDER_COLOR)
+            app.asset_loader.request_texture(texture_path, self.path, self._apply_texture)
+
+        # Drawn by the scene's OrbitPaths even while the other paths are toggled off.
+        self.debug_orbit = debug_orbit
 
         self.ring_np = None
         if rings:
@@ -164,66 +239,67 @@ class CelestialBody:
             outer  = rings["outer_radius"]
             tex    = rings["texture"]
             speed  = rings.get("rotation_speed", self.rotation_speed)
-            vdata = _make_ring_vertex_data(inner, outer)
-            prim  = _make_ring_primitive()
-            geom  = Geom(vdata)
-            geom.add_primitive(prim)
-            node  = GeomNode('saturn_ring')
-            node.add_geom(geom)
+            node  = mesh_cache.make_node('saturn_ring', _make_ring_geom, inner, outer, 64)
             ring_np = self.node.attach_new_node(node)
             ring_np.setZ(self.radius * 0.01)
             ring_np.setTwoSided(True)
             ring_np.setBin('transparent', 10)
             ring_np.setDepthWrite(False) 
-            ts = TextureStage('ts')
-            ring_np.setTexture(ts, loader.loadTexture(tex))
             ring_np.setTransparency(TransparencyAttrib.M_alpha)
             ring_np.setPythonTag('ring_speed', speed)
+            ring_np.hide()
             self.ring_np = ring_np
+            app.asset_loader.request_texture(tex, self.path, self._apply_ring_texture)
 
-        if overlay and overlay.get("texture"):
-            overlay_node = _make_sphere_geom(1.0, 16, 32)
-            ov_np = self.node.attachNewNode(overlay_node)
-            ov_np.setScale(self.radius * 1.01)
+        if has_overlay:
+            ov_np = _make_lod_sphere(f"{name}_overlay_lod", self.radius * OVERLAY_SCALE, lod_scale, point_sprite=False)
+            ov_np.reparentTo(self.node)
+            ov_np.setScale(self.radius * OVERLAY_SCALE)
             ov_np.setShaderAuto()
-            ov_np.setLight(self.app.sun_light_np)
-            ov_np.setLight(self.app.ambient_light_np)
-            ov_np.setTransparency(TransparencyAttrib.M_alpha)
-            ov_tex = loader.loadTexture(overlay["texture"])
-            ov_tex.setFormat(Texture.FRgba)   
-            ov_tex.setMinfilter(ov_tex.FT_linear_mipmap_linear)
-            ov_tex.setWrapU(ov_tex.WMRepeat)
-            ov_tex.setWrapV(ov_tex.WMClamp)
-            ts2 = TextureStage("overlay")
-            ts2.setMode(TextureStage.MModulate) 
-            ov_np.setTexture(ts2, ov_tex)
+            ov_np.setLight(app.sun_light_np)
+            ov_np.setLight(app.ambient_light_np)
             ov_np.setTransparency(TransparencyAttrib.MAlpha)
             ov_np.setBin("transparent", 20)
             ov_np.setDepthWrite(False)
             ov_np.setDepthTest(True)
             ov_np.setTwoSided(True)
-            self.overlay_np    = ov_np
-            self.overlay_speed = overlay.get("speed", 0.0)
+            ov_np.hide()
+            self.overlay_np = ov_np
+            app.asset_loader.request_texture(overlay["texture"], self.path, self._apply_overlay_texture)
 
-        if not hasattr(app, 'sun_light_np'):
-            sun_pl = PointLight('sun')
-            sun_pl.setColor(Vec4(1, 1, 0.9, 1))
-            sun_np = app.render.attachNewNode(sun_pl)
-            sun_np.setPos(0, 0, 0)
-            sun_pl.setAttenuation((1, 0, 0.0001))
-            amb = AmbientLight('ambient')
-            amb.setColor(Vec4(0.01, 0.01, 0.01, 1))
-            amb_np = app.render.attachNewNode(amb)
-            app.render.setLight(sun_np)
-            app.render.setLight(amb_np)
-            app.sun_light_np = sun_np
-            app.ambient_light_np = amb_np
-
-        if self.name.lower() != 'sun':
-            self.model.setShaderAuto()
-            self.model.setLight(app.sun_light_np)
-            self.model.setLight(app.ambient_light_np)
     
+    def _apply_texture(self, tex):
+        if self.node.isEmpty():
+            return
+        tex.setMinfilter(tex.FT_linear_mipmap_linear)
+        tex.setWrapU(tex.WMRepeat)
+        tex.setWrapV(tex.WMClamp)
+        ts = TextureStage.getDefault()
+        ts.setMode(TextureStage.MModulate) 
+        self.model.clearColor()
+        self.model.setTexture(ts, tex)
+        self.model.setTexScale(ts, 1, 1)
+        self.model.setTransparency(TransparencyAttrib.M_alpha)
+
+    def _apply_ring_texture(self, tex):
+        if self.node.isEmpty():
+            return
+        ts = TextureStage('ts')
+        self.ring_np.setTexture(ts, tex)
+        self.ring_np.show()
+
+    def _apply_overlay_texture(self, ov_tex):
+        if self.node.isEmpty():
+            return
+        ov_tex.setFormat(Texture.FRgba)   
+        ov_tex.setMinfilter(ov_tex.FT_linear_mipmap_linear)
+        ov_tex.setWrapU(ov_tex.WMRepeat)
+        ov_tex.setWrapV(ov_tex.WMClamp)
+        ts2 = TextureStage("overlay")
+        ts2.setMode(TextureStage.MModulate) 
+        self.overlay_np.setTexture(ts2, ov_tex)
+        self.overlay_np.show()
+
     def _inclined_pos(self, angle_deg):
         """Return position on orbit with inclination applied (rotate about X)."""
         t = math.radians(angle_deg)
@@ -236,32 +312,3 @@ class CelestialBody:
         y = y_flat * math.cos(inc)
         z = y_flat * math.sin(inc)
         return Vec3(x, y, z)
-
-    def _make_orbit_ring(self, parent_node, segs=128, color=(0, 1, 0, 1)):
-        ls = LineSegs()
-        ls.setThickness(1.2)
-        ls.setColor(*color)
-
-        for i in range(segs + 1):
-            p = self._inclined_pos(i * 360 / segs)
-            if i == 0:
-                ls.moveTo(p)
-            else:
-                ls.drawTo(p)
-
-        NodePath(ls.create()).reparentTo(parent_node)
-
-    def update_task(self, task):
-        dt = globalClock.getDt() * self.app._speed_factor
-        if not self.app._frozen_time:
-
-            self.orbit_angle = clamp_angle(self.orbit_angle + self.orbit_speed * dt)
-            self.node.setPos(self._inclined_pos(self.orbit_angle))
-
-            self.rotation_angle += self.rotation_speed * dt
-
-            if self.overlay_np:
-                self.overlay_rotation_angle += self.overlay_rotation_speed * dt
-                self.overlay_np.setHpr(self.overlay_rotation_angle, -90, 0)
-
-        return task.cont
@@ -0,0 +1,145 @@
+import numpy as np
+from panda3d.core import (
+    ConfigVariableBool, ConfigVariableDouble, Geom, GeomEnums, GeomLinestrips,
+    GeomVertexFormat, OmniBoundingVolume, Shader, Texture, TransparencyAttrib
+)
+
+from utils.geom_arrays import make_vertex_data
+from utils.mesh_cache import mesh_cache
+from utils.orbit_math import solve_kepler
+
+show_orbit_paths = ConfigVariableBool(
+    'sim-orbit-paths', False,
+    'Draw every orbit path at startup; bodies with "debug_orbit" in the scene always get theirs.'
+)
+orbit_trail = ConfigVariableDouble(
+    'sim-orbit-trail', 1.0,
+    'Fraction of an orbit each path covers behind its body, fading out with age.'
+)
+
+PATH_SHADER   = ("../assets/shaders/orbit_path.vert", "../assets/shaders/orbit_path.frag")
+PATH_SEGMENTS = 128
+# Opacity of the oldest end of a trail, so a full orbit stays faintly visible.
+TRAIL_FLOOR   = 0.15
+PATH_COLOR    = (0.0, 1.0, 0.0)
+PATH_COLORS   = {"moon": (0.45, 0.6, 1.0), "comet": (0.7, 0.9, 1.0)}
+
+
+def _make_path_geom(segments=PATH_SEGMENTS):
+    """A line strip whose vertex x runs from 0 to 1; the shader bends it onto an orbit."""
+    u = np.zeros((segments + 1, 3))
+    u[:, 0] = np.linspace(0.0, 1.0, segments + 1)
+    strip = GeomLinestrips(Geom.UHStatic)
+    strip.addConsecutiveVertices(0, segments + 1)
+    strip.closePrimitive()
+    geom = Geom(make_vertex_data('orbit_path', GeomVertexFormat.get_v3(), {'vertex': u}))
+    geom.addPrimitive(strip)
+    return geom
+
+
+class OrbitPaths:
+    """
+    Every orbit path in one instanced draw of a shared line strip.
+
+    Nothing is built per body: the vertex shader places each instance's
+    vertices along its orbit, behind the body, from the elements in a
+    buffer texture, and fades them by how long ago the body passed, so the
+    path doubles as a trail. Per frame only the bodies' render positions
+    and eccentric anomalies, and where their trails end, are uploaded;
+    edits and hot reloads just mark the rows for a rebuild.
+
+    Paths follow the Kepler elements, so they are hidden under n-body
+    physics, and during a replay, whose positions the engine does not have.
+    """
+
+    def __init__(self, app, engine, origin, root_node):
+        self.app = app
+        self.engine = engine
+        self.origin = origin
+        self.enabled = show_orbit_paths.getValue()
+        self.trail = min(max(orbit_trail.getValue(), 0.0), 1.0)
+
+        self.node = root_node.attachNewNode(mesh_cache.make_node('orbit_paths', _make_path_geom, PATH_SEGMENTS))
+        # The Geom is a unit segment; its instances can be anywhere.
+        self.node.node().setBounds(OmniBoundingVolume())
+        self.node.node().setFinal(True)
+        self.orbits = Texture("orbit_paths")
+        self.node.setShader(Shader.load(Shader.SL_GLSL, vertex=PATH_SHADER[0], fragment=PATH_SHADER[1]))
+        self.node.setShaderInput("orbits", self.orbits)
+        self.node.setShaderInput("trail_span", 2 * np.pi * max(self.trail, 1e-6))
+        self.node.setShaderInput("trail_floor", TRAIL_FLOOR)
+        self.node.setTransparency(TransparencyAttrib.MAlpha)
+        self.node.setBin("transparent", 0)
+        self.node.setDepthWrite(False)
+        self.node.setLightOff()
+        self.node.hide()
+
+        self._rows = np.zeros(0, dtype=np.int64)
+        self.invalidate()
+
+    def toggle(self):
+        """Shows or hides the paths of bodies without "debug_orbit"."""
+        self.enabled = not self.enabled
+        self.invalidate()
+
+    def invalidate(self):
+        """Marks the drawn rows stale, e.g. after bodies were added, removed or edited."""
+        self._dirty = True
+
+    def _orbit_data(self):
+        """The buffer texture's RAM image as a writable (rows, 3, 4) float32 array."""
+        data = np.frombuffer(memoryview(self.orbits.modifyRamImage()), dtype=np.float32)
+        return data.reshape(-1, 3, 4)[:len(self._rows)]
+
+    def _rebuild(self):
+        engine = self.engine
+        n = engine.count
+        drawn = engine.orbit_radius[:n] > 0
+        if not self.enabled:
+            drawn &= np.array([getattr(body, "debug_orbit", False) for body in engine.bodies], dtype=bool)
+        rows = self._rows = np.flatnonzero(drawn)
+
+        self.orbits.setupBufferTexture(3 * max(len(rows), 1), Texture.T_float, Texture.F_rgba32,
+                                       GeomEnums.UH_dynamic)
+        data = self._orbit_data()
+        data[:, 0, 0] = engine.orbit_radius[rows]
+        data[:, 0, 1] = engine.semi_minor[rows]
+        data[:, 0, 2] = engine.eccentricity[rows]
+        data[:, 0, 3] = np.radians(engine.inclination[rows])
+        kinds = engine.kind[rows]
+        for k, kind in enumerate(engine.kinds):
+            data[kinds == k, 2, :3] = PATH_COLORS.get(kind, PATH_COLOR)
+        # Trails run backwards from the body, whichever way it goes round.
+        self._span = np.where(engine.orbit_speed[rows] < 0, 1.0, -1.0) * 2 * np.pi * self.trail
+        self.node.setInstanceCount(len(rows))
+
+        self._state = None
+        self._dirty = False
+
+    def update(self, live=True):
+        """Uploads the bodies' current positions; live=False hides the paths, e.g. during a replay."""
+        if self._dirty:
+            self._rebuild()
+        engine = self.engine
+        if not live or not len(self._rows) or engine.integrator is not None:
+            self.node.hide()
+            return
+        self.node.show()
+        state = (engine.time, self.origin.version)
+        if state == self._state:
+            return
+        self._state = state
+
+        rows = self._rows
+        eccentricity = engine.eccentricity[rows]
+        mean_anomaly = np.radians(engine.orbit_phase[rows] + engine.orbit_speed[rows] * engine.time)
+        anomaly = solve_kepler(mean_anomaly, eccentricity)
+        data = self._orbit_data()
+        data[:, 1, :3] = self.origin.to_render(engine.world_positions()[rows])
+        data[:, 1, 3] = anomaly
+        if self.trail < 1:
+            # The eccentric anomaly the body had a trail's worth of time ago, unwrapped to lie behind it.
+            end = solve_kepler(mean_anomaly + self._span, eccentricity) - anomaly
+            data[:, 2, 3] = end + 2 * np.pi * np.round((self._span - end) / (2 * np.pi))
+        else:
+            data[:, 2, 3] = self._span
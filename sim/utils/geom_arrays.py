@@ -0,0 +1,57 @@
+import numpy as np
+from panda3d.core import Geom, GeomTriangles, GeomVertexData
+
+
+def make_vertex_data(name, fmt, columns, usage=Geom.UHStatic):
+    """
+    Builds a GeomVertexData of fmt from whole columns at once. columns maps
+    a column name ('vertex', 'normal', 'texcoord', ...) to an (n, k) array;
+    they are interleaved into one float32 block with numpy and copied into
+    the vertex array through the buffer protocol, instead of one
+    GeomVertexWriter call per vertex.
+    """
+    if fmt.getNumArrays() != 1:
+        raise ValueError("make_vertex_data needs a single-array vertex format")
+    array_format = fmt.getArray(0)
+    n = len(next(iter(columns.values())))
+    rows = np.zeros((n, array_format.getStride() // 4), dtype=np.float32)
+    for column_name, values in columns.items():
+        column = array_format.getColumn(column_name)
+        if column is None or column.getNumericType() != Geom.NT_float32:
+            raise ValueError(f"{fmt} has no float32 column {column_name!r}")
+        start = column.getStart() // 4
+        rows[:, start:start + column.getNumComponents()] = values
+
+    vdata = GeomVertexData(name, fmt, usage)
+    vdata.uncleanSetNumRows(n)
+    memoryview(vdata.modifyArray(0)).cast('B')[:] = rows.tobytes()
+    return vdata
+
+
+def make_triangles(indices, usage=Geom.UHStatic):
+    """A GeomTriangles over a flat array of vertex indices, three per triangle."""
+    indices = np.asarray(indices).ravel()
+    tris = GeomTriangles(usage)
+    # 0xffff is reserved as the strip-cut index, so 16 bits only cover that many vertices.
+    wide = indices.size and indices.max() >= 0xffff
+    tris.setIndexType(Geom.NT_uint32 if wide else Geom.NT_uint16)
+    array = tris.modifyVertices()
+    array.uncleanSetNumRows(indices.size)
+    memoryview(array).cast('B')[:] = indices.astype(np.uint32 if wide else np.uint16).tobytes()
+    # Handing the array back resets the primitive's cached vertex range.
+    tris.setVertices(array)
+    return tris
+
+
+def grid_triangles(rows, cols):
+    """
+    Indices of a (rows + 1) x (cols + 1) vertex grid split into two
+    triangles per cell, in the winding the sphere builders use.
+    """
+    stride = cols + 1
+    i, j = np.meshgrid(np.arange(rows), np.arange(cols), indexing='ij')
+    v0 = (i * stride + j).ravel()
+    v1 = v0 + 1
+    v2 = v0 + stride
+    v3 = v2 + 1
+    return np.stack((v0, v2, v1, v1, v2, v3), axis=1)
@@ -0,0 +1,45 @@
+from panda3d.core import GeomNode
+
+
+class MeshCache:
+    """
+    Builds every procedural mesh once per (generator, parameters) key and
+    shares the resulting Geom between all GeomNodes that use it, so the
+    vertex data is uploaded to the GPU a single time.
+    """
+
+    def __init__(self):
+        self._geoms = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_geom(self, generator, *params):
+        key = (generator, params)
+        geom = self._geoms.get(key)
+        if geom is None:
+            self.misses += 1
+            geom = generator(*params)
+            self._geoms[key] = geom
+        else:
+            self.hits += 1
+        return geom
+
+    def make_node(self, name, generator, *params):
+        """Returns a new GeomNode instancing the cached Geom."""
+        node = GeomNode(name)
+        node.addGeom(self.get_geom(generator, *params))
+        return node
+
+    def stats(self):
+        return {"meshes": len(self._geoms), "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        self._geoms.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return "MeshCache(meshes={meshes}, hits={hits}, misses={misses})".format(**self.stats())
+
+
+mesh_cache = MeshCache()
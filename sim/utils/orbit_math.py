@@ -1,4 +1,5 @@
 from math import sin, cos, radians
+import numpy as np
 from panda3d.core import Vec3
 
 def get_orbit_position(orbit_radius, orbit_angle_degrees, center=Vec3(0, 0, 0)):
@@ -18,3 +19,42 @@ def clamp_angle(angle):
 
 def degrees_to_radians(deg):
     return radians(deg)
+
+def inclined_positions(semi_major, semi_minor, eccentricity, inclination_deg, angle_deg, out=None):
+    """
+    Vectorized version of CelestialBody._inclined_pos.
+    Every argument is an array of the same length; returns an (n, 3) array.
+    """
+    t = np.radians(angle_deg)
+    inc = np.radians(inclination_deg)
+    if out is None:
+        out = np.empty((len(t), 3))
+    y_flat = semi_minor * np.sin(t)
+    out[:, 0] = semi_major * np.cos(t) - semi_major * eccentricity
+    out[:, 1] = y_flat * np.cos(inc)
+    out[:, 2] = y_flat * np.sin(inc)
+    return out
+
+def solve_kepler(mean_anomaly, eccentricity, tol=1e-12, max_iter=32):
+    """
+    Solves Kepler's equation M = E - e*sin(E) for the eccentric anomaly E.
+    Vectorized Newton iteration seeded with Danby's guess E0 = M + 0.85*e*sign(sin M),
+    which converges for every 0 <= e < 1. Angles are in radians.
+    """
+    M = np.mod(np.asarray(mean_anomaly, dtype=np.float64) + np.pi, 2 * np.pi) - np.pi
+    e = np.asarray(eccentricity, dtype=np.float64)
+    E = M + 0.85 * e * np.sign(np.sin(M))
+    for _ in range(max_iter):
+        delta = (E - e * np.sin(E) - M) / (1 - e * np.cos(E))
+        E -= delta
+        if np.all(np.abs(delta) < tol):
+            break
+    return E
+
+def kepler_positions(semi_major, semi_minor, eccentricity, inclination_deg, mean_anomaly_deg, out=None):
+    """
+    Positions at the given mean anomalies, following Kepler's second law.
+    Same orbit shape and axes as inclined_positions, which takes the eccentric anomaly.
+    """
+    E = solve_kepler(np.radians(mean_anomaly_deg), eccentricity)
+    return inclined_positions(semi_major, semi_minor, eccentricity, inclination_deg, np.degrees(E), out)
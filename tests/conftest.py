@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The simulator's modules import each other from sim/, as when it runs.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sim'))
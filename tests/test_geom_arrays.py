@@ -0,0 +1,111 @@
+import importlib.util
+import math
+import os
+
+import numpy as np
+import pytest
+from panda3d.core import (
+    Geom, GeomTriangles, GeomVertexData, GeomVertexFormat, GeomVertexWriter, loadPrcFileData
+)
+
+loadPrcFileData('', 'window-type none')
+
+from objects.celestial_body import SPHERE_LODS, _make_ring_geom, _make_sphere_geom
+
+SIM_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sim')
+
+
+def _load_sim_app():
+    """sim/__main__.py as a module, without running its entry point."""
+    spec = importlib.util.spec_from_file_location('sim_app', os.path.join(SIM_DIR, '__main__.py'))
+    sim_app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sim_app)
+    return sim_app
+
+
+def _reference_grid_geom(name, fmt, radius, lat_steps, long_steps, normals):
+    """The per-vertex GeomVertexWriter sphere builder the numpy ones replaced."""
+    vdata    = GeomVertexData(name, fmt, Geom.UHStatic)
+    vwriter  = GeomVertexWriter(vdata, 'vertex')
+    nwriter  = GeomVertexWriter(vdata, 'normal') if normals else None
+    uvwriter = GeomVertexWriter(vdata, 'texcoord')
+    for i in range(lat_steps + 1):
+        phi = math.pi * i / lat_steps
+        v   = i / lat_steps
+        for j in range(long_steps + 1):
+            theta = 2 * math.pi * j / long_steps
+            x = radius * math.sin(phi) * math.cos(theta)
+            y = radius * math.sin(phi) * math.sin(theta)
+            z = radius * math.cos(phi)
+            vwriter.add_data3(x, y, z)
+            if nwriter:
+                nwriter.add_data3(x / radius, y / radius, z / radius)
+            uvwriter.add_data2(j / long_steps, 1 - v)
+
+    tris = GeomTriangles(Geom.UHStatic)
+    stride = long_steps + 1
+    for i in range(lat_steps):
+        for j in range(long_steps):
+            v0, v1 = i * stride + j, i * stride + j + 1
+            v2, v3 = v0 + stride, v1 + stride
+            tris.add_vertices(v0, v2, v1)
+            tris.add_vertices(v1, v2, v3)
+    geom = Geom(vdata)
+    geom.add_primitive(tris)
+    return geom
+
+
+def _reference_ring_geom(inner_radius, outer_radius, segments):
+    """The per-vertex ring builder _make_ring_geom replaced."""
+    vdata   = GeomVertexData('ring', GeomVertexFormat.get_v3t2(), Geom.UHStatic)
+    vwriter = GeomVertexWriter(vdata, 'vertex')
+    twriter = GeomVertexWriter(vdata, 'texcoord')
+    ratio = inner_radius / outer_radius
+    for i in range(segments + 1):
+        t = 2 * math.pi * i / segments
+        vwriter.add_data3(outer_radius * math.cos(t), outer_radius * math.sin(t), 0)
+        twriter.add_data2(math.cos(t) * 0.5 + 0.5, math.sin(t) * 0.5 + 0.5)
+        vwriter.add_data3(inner_radius * math.cos(t), inner_radius * math.sin(t), 0)
+        twriter.add_data2(math.cos(t) * ratio * 0.5 + 0.5, math.sin(t) * ratio * 0.5 + 0.5)
+    tris = GeomTriangles(Geom.UHStatic)
+    for i in range(segments):
+        idx = 2 * i
+        tris.add_vertices(idx, idx + 1, idx + 2)
+        tris.add_vertices(idx + 2, idx + 1, idx + 3)
+    geom = Geom(vdata)
+    geom.add_primitive(tris)
+    return geom
+
+
+def _geom_arrays(geom):
+    vdata = geom.getVertexData()
+    vertices = np.frombuffer(memoryview(vdata.getArray(0)).cast('B'), dtype=np.float32)
+    indices = np.array(geom.getPrimitive(0).getVertexList())
+    return vertices.reshape(vdata.getNumRows(), -1), indices
+
+
+def _assert_same_geom(new, old):
+    new_v, new_i = _geom_arrays(new)
+    old_v, old_i = _geom_arrays(old)
+    assert new_v.shape == old_v.shape
+    np.testing.assert_allclose(new_v, old_v, rtol=1e-6, atol=1e-6)
+    np.testing.assert_array_equal(new_i, old_i)
+
+
+@pytest.mark.parametrize("lat_steps, long_steps", SPHERE_LODS + ((6, 8), (256, 512)))
+def test_sphere_matches_reference(lat_steps, long_steps):
+    _assert_same_geom(
+        _make_sphere_geom(1.0, lat_steps, long_steps),
+        _reference_grid_geom('sphere', GeomVertexFormat.get_v3n3t2(), 1.0, lat_steps, long_steps, True),
+    )
+
+
+def test_sky_sphere_matches_reference():
+    _assert_same_geom(
+        _load_sim_app()._make_sky_sphere(1500, 16, 32),
+        _reference_grid_geom('sky', GeomVertexFormat.get_v3t2(), 1500, 16, 32, False),
+    )
+
+
+def test_ring_matches_reference():
+    _assert_same_geom(_make_ring_geom(1.3, 2.2, 64), _reference_ring_geom(1.3, 2.2, 64))
@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+
+from core.nbody import unbound_satellites
+from core.scene_file import load_scene
+from core.simulation import Simulation
+
+SCENE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sim', 'scene.json')
+
+
+def _moons(sim):
+    engine = sim.engine
+    return np.flatnonzero(engine.depth[:engine.count] == 2)
+
+
+def test_scene_moons_stay_inside_hill_radius():
+    sim = Simulation.from_scene(dict(load_scene(SCENE), physics="nbody"), dt=1 / 120)
+    engine = sim.engine
+    masses = engine.integrator.masses
+    moons = np.setdiff1d(_moons(sim), unbound_satellites(engine, masses))
+    planets = engine.parent[moons]
+    suns = engine.parent[planets]
+    assert moons.size
+
+    for step in range(1200):
+        engine.step(sim.dt)
+        if step % 30:
+            continue
+        pos = engine.integrator.positions
+        hill = np.linalg.norm(pos[planets] - pos[suns], axis=1) * np.cbrt(masses[planets] / (3 * masses[suns]))
+        distance = np.linalg.norm(pos[moons] - pos[planets], axis=1)
+        escaped = [sim.paths[i] for i in moons[distance > hill]]
+        assert not escaped, f"left their parent's Hill sphere by t = {engine.time:.2f}s: {escaped}"
+
+
+def test_scene_inner_moons_are_bound():
+    sim = Simulation.from_scene(dict(load_scene(SCENE), physics="nbody"), dt=1 / 120)
+    unbound = {sim.paths[i] for i in unbound_satellites(sim.engine, sim.engine.integrator.masses)}
+    for path in ("/Sun/Jupiter/Io", "/Sun/Jupiter/Ganymede", "/Sun/Saturn/Titan", "/Sun/Uranus/Oberon"):
+        assert path not in unbound